@@ -1,100 +1,258 @@
 #!/usr/bin/env python3
 """Simple aggregator that consumes audio feature messages and produces a rolling noise profile."""
-import json
 import time
 import sys
 import os
 import logging
+import queue
+import threading
 from collections import deque
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 
-import paho.mqtt.client as mqtt
 import numpy as np
+import orjson
+import paho.mqtt.client as mqtt
+
+try:
+    from ciso8601 import parse_datetime
+except ImportError:
+    parse_datetime = datetime.fromisoformat
 
 # Add shared/utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../shared'))
 try:
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 except ImportError:
     # Fallback if running from root
     sys.path.append(os.path.join(os.getcwd(), 'shared'))
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class NoiseProfile:
+    """Rolling window of RMS samples with O(1) amortized add/summary.
+
+    Mean is tracked with a running sum; min/max use monotonic deques
+    (ascending for min, descending for max) so no full-window scan is needed.
+    Timestamps and values live in parallel ring buffers, so expiry is a
+    binary search plus a head bump however many samples fall out at once,
+    and `resync` can re-add the window in at most two vectorized sums.
+    """
+
     def __init__(self, window_s=Config.AGGREGATION_WINDOW_SEC):
         self.window_s = window_s
-        self.samples = deque()
+        # Parallel ring buffers (epoch microseconds, dB); grow when full
+        self._ts = np.empty(256, dtype=np.int64)
+        self._values = np.empty(256, dtype=np.float64)
+        self._head = 0
+        self._count = 0
+        self._sum = 0.0
+        # (ts, value) pairs; values strictly decreasing / increasing
+        self._max_dq = deque()
+        self._min_dq = deque()
 
     def add(self, timestamp, rms_db):
-        # Handle timestamp parsing (ISO format)
+        # Handle timestamp parsing (ISO format), stored as epoch microseconds
+        ts = self._parse_ts(timestamp)
+        count = self._count
+        cap = len(self._values)
+        if count:
+            last = self._ts.item((self._head + count - 1) % cap)
+            if ts < last:
+                # Keep the window time-ordered so expiry stays a binary search
+                ts = last
+
+        if count == cap:
+            head = self._head
+            self._ts = np.concatenate(
+                (self._ts[head:], self._ts[:head], np.empty(cap, dtype=np.int64))
+            )
+            self._values = np.concatenate(
+                (self._values[head:], self._values[:head], np.empty(cap))
+            )
+            self._head = 0
+            cap *= 2
+        tail = (self._head + count) % cap
+        self._ts[tail] = ts
+        self._values[tail] = rms_db
+        self._count = count + 1
+        self._sum += rms_db
+
+        while self._max_dq and self._max_dq[-1][1] <= rms_db:
+            self._max_dq.pop()
+        self._max_dq.append((ts, rms_db))
+        while self._min_dq and self._min_dq[-1][1] >= rms_db:
+            self._min_dq.pop()
+        self._min_dq.append((ts, rms_db))
+
+        self._expire()
+
+    @staticmethod
+    def _parse_ts(timestamp):
         try:
-            ts = datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+            if not timestamp:
+                return time.time_ns() // 1000
+            dt = parse_datetime(timestamp)
         except ValueError:
-            ts = datetime.utcnow()
-            
-        self.samples.append((ts, rms_db))
-        self._expire()
+            return time.time_ns() // 1000
+        if dt.tzinfo is None:
+            # Sensor timestamps are naive UTC
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp() * 1_000_000)
 
     def _expire(self):
-        cutoff = datetime.utcnow() - timedelta(seconds=self.window_s)
-        while self.samples and self.samples[0][0] < cutoff:
-            self.samples.popleft()
+        cutoff = time.time_ns() // 1000 - self.window_s * 1_000_000
+        count = self._count
+        head = self._head
+        if count and self._ts.item(head) < cutoff:
+            cap = len(self._ts)
+            # The window is at most two sorted runs: [head:] and a wrapped [:rest]
+            first = min(count, cap - head)
+            drop = int(np.searchsorted(self._ts[head:head + first], cutoff))
+            dropped = self._values[head:head + drop].sum()
+            if drop == first and count > first:
+                more = int(np.searchsorted(self._ts[:count - first], cutoff))
+                dropped += self._values[:more].sum()
+                drop += more
+            self._sum -= float(dropped)
+            self._head = (head + drop) % cap
+            self._count = count - drop
+        while self._max_dq and self._max_dq[0][0] < cutoff:
+            self._max_dq.popleft()
+        while self._min_dq and self._min_dq[0][0] < cutoff:
+            self._min_dq.popleft()
+        if not self._count:
+            # Clear accumulated float drift once the window empties
+            self._sum = 0.0
+
+    def resync(self):
+        """Recompute the window aggregates from scratch to shed running-sum drift."""
+        count = self._count
+        if not count:
+            return
+        head = self._head
+        end = head + count
+        cap = len(self._values)
+        # Min/max come from the deques; only the sum can drift
+        if end <= cap:
+            total = self._values[head:end].sum()
+        else:
+            total = self._values[head:].sum() + self._values[:end - cap].sum()
+        self._sum = float(total)
 
     def summary(self):
-        if not self.samples:
+        count = self._count
+        if not count:
             return {"count": 0}
-        vals = [v for _, v in self.samples]
         return {
-            "count": len(vals),
-            "mean_rms_db": float(np.mean(vals)),
-            "max_rms_db": float(np.max(vals)),
-            "min_rms_db": float(np.min(vals)),
+            "count": count,
+            "mean_rms_db": self._sum / count,
+            "max_rms_db": self._max_dq[0][1],
+            "min_rms_db": self._min_dq[0][1],
         }
 
 class AggregatorService:
-    def __init__(self):
+    def __init__(self, flush_interval_s=Config.PROFILE_FLUSH_MS / 1000.0):
         self.profile = NoiseProfile()
+        self.flush_interval_s = flush_interval_s
+        # Newest summary not yet published; each one supersedes the last
+        self._latest = None
+        self._flush_timer = None
+        self._lock = threading.Lock()
         self.client = mqtt.Client()
+        # Fire-and-forget publishes must never stall the callback thread
+        self.client.max_queued_messages_set(0)
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
 
+        # Messages are processed off Paho's network thread
+        self._queue = queue.Queue(maxsize=1024)
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._drain, daemon=True)
+
     def on_connect(self, client, userdata, flags, rc):
         logger.info(f"Connected to MQTT broker with result code {rc}")
         client.subscribe(Config.TOPIC_AUDIO_FEATURES)
         logger.info(f"Subscribed to {Config.TOPIC_AUDIO_FEATURES}")
 
     def on_message(self, client, userdata, msg):
+        # Hand off and return so the socket read loop never blocks
         try:
-            payload = json.loads(msg.payload.decode())
+            self._queue.put_nowait(msg.payload)
+        except queue.Full:
+            logger.warning("Ingest queue full, dropping message")
+
+    def _drain(self):
+        while not self._stop.is_set():
+            try:
+                raw = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._handle(raw)
+
+    def _handle(self, raw):
+        try:
+            payload = orjson.loads(raw)
             rms = float(payload.get("rms_db", 0.0))
             timestamp = payload.get("timestamp")
             
             self.profile.add(timestamp, rms)
             summary = self.profile.summary()
-            
-            summary_payload = json.dumps({
-                "timestamp": datetime.utcnow().isoformat(),
-                "profile": summary
-            })
-            
-            client.publish(Config.TOPIC_NOISE_PROFILE, summary_payload)
-            logger.debug(f"Published profile: {summary_payload}")
+
+            # Coalesce summaries; one publish per flush interval
+            with self._lock:
+                self._latest = summary
+                if self._flush_timer is None:
+                    # Once per flush interval, on the thread that owns the profile
+                    self.profile.resync()
+                    self._flush_timer = threading.Timer(self.flush_interval_s, self._flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
             
         except Exception as e:
             logger.error(f"Error handling message: {e}")
 
+    def _flush(self):
+        with self._lock:
+            summary = self._latest
+            self._latest = None
+            self._flush_timer = None
+        if summary is None:
+            return
+        try:
+            summary_payload = orjson.dumps(
+                {"timestamp": utc_timestamp(), "profile": summary}
+            )
+            self.client.publish(
+                Config.TOPIC_NOISE_PROFILE, summary_payload, qos=0, retain=False
+            )
+            logger.debug(f"Published profile: {summary_payload}")
+        except Exception as e:
+            logger.error(f"Error publishing profile: {e}")
+
     def run(self):
         logger.info(f"Connecting to {Config.MQTT_BROKER}:{Config.MQTT_PORT}")
         try:
             self.client.connect(Config.MQTT_BROKER, Config.MQTT_PORT, 60)
-            self.client.loop_forever()
+            self._worker.start()
+            self.client.loop_start()
+            self._stop.wait()
         except KeyboardInterrupt:
             logger.info("Stopping aggregator service")
         except Exception as e:
             logger.error(f"Connection error: {e}")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker.is_alive():
+            self._worker.join(timeout=1.0)
+        self._flush()
+        self.client.loop_stop()
 
 if __name__ == "__main__":
     service = AggregatorService()
@@ -14,28 +14,34 @@ Usage:
 """
 
 import argparse
-import json
+import importlib.util
 import logging
 import os
 import struct
 import sys
 import time
 from collections import deque
-from datetime import datetime
 
 import numpy as np
+import orjson
 import paho.mqtt.client as mqtt
 
-# Import PyTorch and Silero VAD
+# Silero VAD backends: ONNX Runtime (preferred) or PyTorch
 try:
-    import torch
-    import torchaudio
+    import onnxruntime as ort
 
-    TORCH_AVAILABLE = True
+    ONNX_AVAILABLE = True
 except ImportError:
-    TORCH_AVAILABLE = False
+    ONNX_AVAILABLE = False
+
+# torch costs seconds and hundreds of MB to import, so it is only loaded
+# once the torch backend is actually selected (see _init_torch)
+torch = None
+TORCH_AVAILABLE = importlib.util.find_spec("torch") is not None
+
+if not (ONNX_AVAILABLE or TORCH_AVAILABLE):
     print(
-        "ERROR: torch/torchaudio not installed. Install with: uv pip install -e '.[vad]'"
+        "ERROR: onnxruntime/torch not installed. Install with: uv pip install -e '.[vad]'"
     )
     sys.exit(1)
 
@@ -43,9 +49,11 @@ except ImportError:
 sys.path.append(os.path.join(os.path.dirname(__file__), "../shared"))
 try:
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 except ImportError:
     sys.path.append(os.path.join(os.getcwd(), "shared"))
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -53,55 +61,200 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+# WAV header fields are little-endian uint32
+_U32LE = struct.Struct("<I").unpack_from
+
+SILERO_DATA_URL = "https://github.com/snakers4/silero-vad/raw/master/src/silero_vad/data"
+
+
+def _download_model(path):
+    """Fetch a Silero ONNX export by file name into `path` unless present."""
+    if os.path.exists(path):
+        return path
+
+    from urllib.request import urlretrieve
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    logger.info(f"Downloading Silero ONNX model to {path}...")
+    # Download beside the target and rename, so an interrupted fetch never
+    # leaves a partial file that later runs would take as the model
+    tmp_path = f"{path}.part"
+    try:
+        urlretrieve(f"{SILERO_DATA_URL}/{os.path.basename(path)}", tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
 class SileroVAD:
     """Wrapper for Silero VAD model with streaming support."""
 
-    def __init__(self, sample_rate=16000, device="cpu", min_silence_duration_ms=500):
+    # EMA weight for the adaptive gate's noise floor when it rises
+    NOISE_FLOOR_ALPHA = 0.05
+    # Gated windows in a row (~1s at 16kHz) after which model state is reset
+    GATE_RESET_WINDOWS = 32
+
+    def __init__(
+        self,
+        sample_rate=16000,
+        device="cpu",
+        min_silence_duration_ms=500,
+        backend=None,
+        model_path=Config.VAD_ONNX_MODEL,
+        gate_dbfs=None,
+        gate_margin_db=None,
+        num_threads=1,
+    ):
         """
         Initialize Silero VAD.
 
         Args:
             sample_rate: Audio sample rate (default 16000 Hz)
-            device: 'cpu' or 'cuda'
+            device: 'cpu' or 'cuda' (torch backend only)
             min_silence_duration_ms: Grace period in ms before ending speech (default 500ms)
+            backend: 'onnx' or 'torch' (default: onnx if onnxruntime is installed)
+            model_path: Silero ONNX model path, downloaded on first use (onnx backend only)
+            gate_dbfs: Skip the model for windows whose RMS is below this level
+                       (e.g. -55); they are scored as silence. None disables.
+            gate_margin_db: Also skip windows less than this many dB above a
+                            tracked noise floor (e.g. 6). None disables.
+            num_threads: intra-op threads (per ONNX Runtime session, or the
+                         process-wide torch pool on the torch backend)
         """
         self.sample_rate = sample_rate
         self.device = device
         self.min_silence_duration_ms = min_silence_duration_ms
+        self.backend = backend or ("onnx" if ONNX_AVAILABLE else "torch")
+        self.num_threads = num_threads
         self.triggered = False  # Track if we're currently in speech state
 
-        logger.info("Loading Silero VAD model...")
-        self.model, utils = torch.hub.load(
+        # Silero VAD requires 512 samples for 16kHz (or 256 for 8kHz)
+        self.window_samples = 512 if sample_rate == 16000 else 256
+
+        # Streaming hysteresis parameters (same as Silero's VADIterator).
+        # Adjusted parameters to reduce false stops during brief pauses:
+        # - min_silence_duration_ms: configurable grace period (default 500ms) - need silence to end speech
+        # - speech_pad_ms: 100ms (increased from 30ms) - pad detected segments with 100ms on each side
+        self.threshold = 0.5
+        self._min_silence_samples = sample_rate * min_silence_duration_ms // 1000
+        self._speech_pad_samples = sample_rate * 100 // 1000
+
+        # Reused float32 window; int16 input is cast and scaled into it
+        self._scratch_f32 = np.zeros(self.window_samples, dtype=np.float32)
+
+        # Energy gate as a sum-of-squares threshold over one normalized window
+        self._gate_energy = None
+        if gate_dbfs is not None:
+            rms = 10.0 ** (gate_dbfs / 20.0)
+            self._gate_energy = np.float32(rms * rms * self.window_samples)
+
+        # Adaptive gate: the noise floor follows the energy of non-speech
+        # windows, dropping at once and rising slowly
+        self._gate_margin = None
+        if gate_margin_db is not None:
+            self._gate_margin = 10.0 ** (gate_margin_db / 10.0)
+        self._noise_floor = None
+
+        logger.info(f"Loading Silero VAD model ({self.backend})...")
+        if self.backend == "onnx":
+            self._init_onnx(model_path)
+        else:
+            self._init_torch()
+
+        self.reset()
+        logger.info("✓ Silero VAD loaded")
+
+    def _init_onnx(self, model_path):
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = self.num_threads
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            _download_model(model_path),
+            sess_options=opts,
+            providers=["CPUExecutionProvider"],
+        )
+
+        # The v5 model expects the previous 64 (16kHz) / 32 (8kHz) samples
+        # prepended to each window; keep them in a reusable input buffer
+        self._context_size = 64 if self.sample_rate == 16000 else 32
+        self._onnx_input = np.zeros(
+            (1, self._context_size + self.window_samples), dtype=np.float32
+        )
+        self._sr = np.array(self.sample_rate, dtype=np.int64)
+        # Convert samples straight into the model input
+        self._scratch_f32 = self._onnx_input[0, self._context_size :]
+
+    def _init_torch(self):
+        global torch
+        if torch is None:
+            import torch
+
+            # Only one model call is ever in flight; torch refuses this
+            # once it has done parallel work, e.g. if the caller used it first
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass
+        # One 512-sample window is far too small to split across threads
+        torch.set_num_threads(self.num_threads)
+        self.model, _ = torch.hub.load(
             repo_or_dir="snakers4/silero-vad",
             model="silero_vad",
             force_reload=False,
             onnx=False,
         )
+        self.model.to(self.device)
+        # Shares memory with the scratch buffer, so no per-frame tensor copy
+        self._scratch_tensor = torch.from_numpy(self._scratch_f32)
+
+    def _speech_prob(self):
+        """Run the model on the scratch window and return the speech probability."""
+        if self.backend == "onnx":
+            ctx = self._context_size
+            out, self._state = self.session.run(
+                None,
+                {"input": self._onnx_input, "state": self._state, "sr": self._sr},
+            )
+            self._onnx_input[0, :ctx] = self._onnx_input[0, -ctx:]
+            return float(out[0, 0])
+
+        with torch.inference_mode():
+            return self.model(self._scratch_tensor, self.sample_rate).item()
+
+    def _iterate(self, speech_prob):
+        """
+        Streaming hysteresis equivalent to Silero's VADIterator.
 
-        self.model.to(device)
+        Returns {'start': sample} / {'end': sample} on segment boundaries,
+        None otherwise.
+        """
+        window = self.window_samples
+        self._current_sample += window
 
-        # Extract utility functions
-        (
-            self.get_speech_timestamps,
-            self.save_audio,
-            self.read_audio,
-            self.VADIterator,
-            self.collect_chunks,
-        ) = utils
+        if speech_prob >= self.threshold and self._temp_end:
+            self._temp_end = 0
 
-        # Initialize VAD iterator for streaming
-        # Adjusted parameters to reduce false stops during brief pauses:
-        # - min_silence_duration_ms: configurable grace period (default 500ms) - need silence to end speech
-        # - speech_pad_ms: 100ms (increased from 30ms) - pad detected segments with 100ms on each side
-        self.vad_iterator = self.VADIterator(
-            self.model,
-            threshold=0.5,
-            sampling_rate=sample_rate,
-            min_silence_duration_ms=min_silence_duration_ms,
-            speech_pad_ms=100,
-        )
+        if speech_prob >= self.threshold and not self._iter_triggered:
+            self._iter_triggered = True
+            start = self._current_sample - self._speech_pad_samples - window
+            return {"start": max(0, start)}
 
-        logger.info("✓ Silero VAD loaded")
+        if speech_prob < self.threshold - 0.15 and self._iter_triggered:
+            if not self._temp_end:
+                self._temp_end = self._current_sample
+            if self._current_sample - self._temp_end < self._min_silence_samples:
+                return None
+            end = self._temp_end + self._speech_pad_samples - window
+            self._temp_end = 0
+            self._iter_triggered = False
+            return {"end": end}
+
+        return None
 
     def process_chunk(self, audio_chunk):
         """
@@ -114,8 +267,21 @@ class SileroVAD:
         Returns:
             dict with 'speech' (bool), 'confidence' (float), 'timestamp' (ms or None)
         """
-        # Silero VAD requires exactly 512 samples for 16kHz
-        required_samples = 512 if self.sample_rate == 16000 else 256
+        return self._classify(self._chunk_prob(audio_chunk))
+
+    def detect(self, audio_chunk):
+        """
+        Like process_chunk, but returns a (speech, confidence) tuple.
+
+        Skips building a result dict; callers that only need the speech flag
+        and probability should prefer this in streaming loops.
+        """
+        speech_prob = self._chunk_prob(audio_chunk)
+        return self._advance(speech_prob)[0], speech_prob
+
+    def _chunk_prob(self, audio_chunk):
+        """Speech probability of a single window."""
+        required_samples = self.window_samples
 
         if len(audio_chunk) != required_samples:
             # Pad or truncate to required size
@@ -129,53 +295,119 @@ class SileroVAD:
                 # Truncate
                 audio_chunk = audio_chunk[:required_samples]
 
-        # Convert to float32 tensor normalized to [-1, 1]
+        # Convert to float32 normalized to [-1, 1] in one fused pass
+        audio_float = self._scratch_f32
         if audio_chunk.dtype == np.int16:
-            audio_float = audio_chunk.astype(np.float32) / 32768.0
+            np.multiply(audio_chunk, INT16_SCALE, out=audio_float, dtype=np.float32)
+        else:
+            audio_float[:] = audio_chunk
+
+        # Quiet windows skip the model and count as silence
+        gate = self._gate_threshold()
+        energy = None
+        if gate is not None or self._gate_margin is not None:
+            energy = float(np.dot(audio_float, audio_float))
+        if gate is not None and energy < gate:
+            self._gated_run += 1
+            if self._gated_run == self.GATE_RESET_WINDOWS:
+                # The carried LSTM state no longer matches the audio after a
+                # long skipped stretch; resume from a fresh state instead
+                self._reset_model()
+            elif self.backend == "onnx":
+                ctx = self._context_size
+                self._onnx_input[0, :ctx] = self._onnx_input[0, -ctx:]
+            if self._gate_margin is not None:
+                self._track_noise(energy)
+            return 0.0
+        self._gated_run = 0
+
+        # Single model call per window; the same probability feeds the
+        # confidence display and the hysteresis state machine
+        speech_prob = self._speech_prob()
+        if self._gate_margin is not None and speech_prob < self.threshold - 0.15:
+            self._track_noise(energy)
+        return speech_prob
+
+    def _gate_threshold(self):
+        """Window energy below which the model is skipped, or None if ungated."""
+        gate = self._gate_energy
+        # The adaptive gate only applies between segments, so quiet
+        # syllables inside speech still reach the model
+        if self._noise_floor is not None and not (
+            self.triggered or self._iter_triggered
+        ):
+            adaptive = self._noise_floor * self._gate_margin
+            gate = adaptive if gate is None else max(gate, adaptive)
+        return gate
+
+    def _track_noise(self, energy):
+        """Update the noise floor with the energy of a non-speech window."""
+        floor = self._noise_floor
+        if floor is None or energy < floor:
+            self._noise_floor = energy
         else:
-            audio_float = audio_chunk.astype(np.float32)
+            self._noise_floor = floor + self.NOISE_FLOOR_ALPHA * (energy - floor)
 
-        # Convert to torch tensor
-        audio_tensor = torch.from_numpy(audio_float)
+    def _reset_model(self):
+        """Clear the model's recurrent state and audio context."""
+        if self.backend == "onnx":
+            self._state = np.zeros((2, 1, 128), dtype=np.float32)
+            self._onnx_input[:] = 0.0
+        else:
+            self.model.reset_states()
 
-        # Get raw speech probability from model for confidence display
-        with torch.no_grad():
-            speech_prob = self.model(audio_tensor, self.sample_rate).item()
+    def _advance(self, speech_prob):
+        """
+        Advance the speech state machine with one window's probability.
 
-        # Process with VAD iterator for state tracking (smoothing/hysteresis)
-        speech_dict = self.vad_iterator(audio_tensor, return_seconds=False)
+        Returns (speech, boundary, event): boundary is the iterator's dict when
+        a segment just ended, event is 'start'/'end' on a state change.
+        """
+        speech_dict = self._iterate(speech_prob)
 
-        # The VAD iterator returns a dict when a speech segment END is detected
+        # The iterator returns a dict on a segment boundary
         # It returns None when continuing in the same state
         if speech_dict:
             # Speech segment ended
             self.triggered = False
+            return False, speech_dict, None
+
+        # Check if speech is currently active
+        # Use probability threshold to determine current state
+        current_speech = speech_prob > 0.5
+
+        # Detect state change (speech started)
+        if current_speech and not self.triggered:
+            self.triggered = True
+            return True, None, "start"
+        elif not current_speech and self.triggered:
+            # This shouldn't happen (iterator should catch it) but handle it
+            self.triggered = False
+            return False, None, "end"
+        # Continuing in same state
+        return self.triggered, None, None
+
+    def _classify(self, speech_prob):
+        """Advance the state machine and build the per-window result dict."""
+        speech, speech_dict, event = self._advance(speech_prob)
+        if speech_dict:
             return {
                 "speech": False,  # Speech just ended
                 "confidence": speech_prob,
                 "start_ms": speech_dict.get("start"),
                 "end_ms": speech_dict.get("end"),
             }
-        else:
-            # Check if speech is currently active
-            # Use probability threshold to determine current state
-            current_speech = speech_prob > 0.5
-
-            # Detect state change (speech started)
-            if current_speech and not self.triggered:
-                self.triggered = True
-                return {"speech": True, "confidence": speech_prob, "event": "start"}
-            elif not current_speech and self.triggered:
-                # This shouldn't happen (iterator should catch it) but handle it
-                self.triggered = False
-                return {"speech": False, "confidence": speech_prob, "event": "end"}
-            else:
-                # Continuing in same state
-                return {"speech": self.triggered, "confidence": speech_prob}
+        if event:
+            return {"speech": speech, "confidence": speech_prob, "event": event}
+        return {"speech": speech, "confidence": speech_prob}
 
     def reset(self):
-        """Reset VAD iterator state."""
-        self.vad_iterator.reset_states()
+        """Reset model and iterator state."""
+        self._reset_model()
+        self._gated_run = 0
+        self._current_sample = 0
+        self._temp_end = 0
+        self._iter_triggered = False
         self.triggered = False
 
 
@@ -187,12 +419,22 @@ class VADService:
         mqtt_broker=Config.MQTT_BROKER,
         mqtt_port=Config.MQTT_PORT,
         device_id="aggregator1",
+        gate_dbfs=None,
+        gate_margin_db=None,
     ):
         self.device_id = device_id
-        self.vad = SileroVAD(sample_rate=16000, device="cpu")
+        self.vad = SileroVAD(
+            sample_rate=16000,
+            device="cpu",
+            gate_dbfs=gate_dbfs,
+            gate_margin_db=gate_margin_db,
+        )
 
         # MQTT setup
         self.client = mqtt.Client()
+        # Fire-and-forget publishes must never stall the audio loop
+        self.client.max_inflight_messages_set(100)
+        self.client.max_queued_messages_set(0)
         self.client.on_connect = self._on_connect
         self.client.connect(mqtt_broker, mqtt_port, 60)
         self.client.loop_start()
@@ -201,6 +443,27 @@ class VADService:
         self.total_chunks = 0
         self.speech_chunks = 0
 
+        # Invariant payload fields, serialized once as an open JSON object
+        source = "silero_vad_v0"
+        self._event_prefix = {
+            event: self._json_prefix(device_id=device_id, event=event, source=source)
+            for event in ("speech_start", "speech_end")
+        }
+        self._segment_prefix = self._json_prefix(
+            device_id=device_id, sample_rate=16000, source=source
+        )
+
+        # Preallocated ring buffer for reassembling fixed-size VAD frames
+        frame_samples = self.vad.window_samples
+        self._ring = np.empty(frame_samples * 4, dtype=np.int16)
+        self._ring_read = 0
+        self._ring_fill = 0
+        self._frame_buf = np.empty(frame_samples, dtype=np.int16)
+
+        # Speech state across frames
+        self._last_speech_state = False
+        self._segment_start_ms = None
+
         logger.info(f"VAD service initialized (device_id={device_id})")
 
     def _on_connect(self, client, userdata, flags, rc):
@@ -209,38 +472,114 @@ class VADService:
         else:
             logger.error(f"Failed to connect to MQTT broker: {rc}")
 
+    @staticmethod
+    def _json_prefix(**fields):
+        """Serialize static fields as `{...,` so variable fields can be appended."""
+        return orjson.dumps(fields)[:-1] + b","
+
     def publish_vad_event(
         self, event_type, confidence=None, start_ms=None, end_ms=None
     ):
         """Publish VAD event to MQTT."""
-        timestamp = datetime.utcnow().isoformat() + "Z"
+        timestamp = utc_timestamp()
 
-        if event_type in ["speech_start", "speech_end"]:
+        if event_type in self._event_prefix:
             # Discrete event
-            payload = {
-                "timestamp": timestamp,
-                "device_id": self.device_id,
-                "event": event_type,
-                "source": "silero_vad_v0",
-            }
+            prefix = self._event_prefix[event_type]
+            fields = {"timestamp": timestamp}
             topic = Config.TOPIC_VAD_EVENT
+            # Start/end transitions are rare and must not be lost
+            qos = 1
         else:
             # Segment summary
-            payload = {
+            prefix = self._segment_prefix
+            fields = {
                 "timestamp": timestamp,
-                "device_id": self.device_id,
                 "speech": event_type == "speech",
                 "start_ms": start_ms,
                 "end_ms": end_ms,
                 "confidence": confidence,
-                "sample_rate": 16000,
-                "source": "silero_vad_v0",
             }
             topic = Config.TOPIC_VAD
+            qos = 0
 
-        self.client.publish(topic, json.dumps(payload))
+        # Only the variable fields are serialized per event
+        payload = prefix + orjson.dumps(fields)[1:]
+        self.client.publish(topic, payload, qos=qos, retain=False)
         logger.debug(f"Published VAD event: {event_type}")
 
+    def _buffer_frames(self, chunk):
+        """
+        Copy a chunk into the ring buffer and yield each complete frame.
+
+        Frames are copied into a reused buffer, so consumers must not keep
+        a reference past the next iteration.
+        """
+        ring = self._ring
+        frame = self._frame_buf
+        cap = len(ring)
+        n = len(frame)
+
+        pos = 0
+        while pos < len(chunk):
+            # Write as much as fits, wrapping around the end of the ring
+            take = min(len(chunk) - pos, cap - self._ring_fill)
+            w = (self._ring_read + self._ring_fill) % cap
+            first = min(take, cap - w)
+            ring[w : w + first] = chunk[pos : pos + first]
+            ring[: take - first] = chunk[pos + first : pos + take]
+            self._ring_fill += take
+            pos += take
+
+            while self._ring_fill >= n:
+                r = self._ring_read
+                first = min(n, cap - r)
+                frame[:first] = ring[r : r + first]
+                frame[first:] = ring[: n - first]
+                self._ring_read = (r + n) % cap
+                self._ring_fill -= n
+                yield frame
+
+    def _handle_result(self, is_speech, confidence, frame_ms):
+        """Track speech state for one VAD window and publish transitions."""
+        self.total_chunks += 1
+
+        # Detect state changes
+        if is_speech and not self._last_speech_state:
+            # Speech started
+            self.publish_vad_event("speech_start", confidence=confidence)
+            self._segment_start_ms = self.total_chunks * frame_ms
+            self._last_speech_state = True
+            self.speech_chunks += 1
+            logger.info(f"🎤 Speech detected (confidence={confidence:.2f})")
+
+        elif not is_speech and self._last_speech_state:
+            # Speech ended
+            segment_end_ms = self.total_chunks * frame_ms
+            self.publish_vad_event("speech_end", confidence=confidence)
+            # Publish segment summary
+            self.publish_vad_event(
+                "speech",
+                confidence=confidence,
+                start_ms=self._segment_start_ms,
+                end_ms=segment_end_ms,
+            )
+            self._last_speech_state = False
+            logger.info(
+                f"🔇 Speech ended (duration={(segment_end_ms - self._segment_start_ms) / 1000:.1f}s)"
+            )
+
+        elif is_speech:
+            # Continuing speech
+            self.speech_chunks += 1
+
+        # Log progress periodically
+        if self.total_chunks % 100 == 0:
+            speech_pct = (self.speech_chunks / self.total_chunks) * 100
+            logger.info(
+                f"Processed {self.total_chunks} chunks ({speech_pct:.1f}% speech)"
+            )
+
     def process_audio_stream(self, audio_generator, frame_ms=32):
         """
         Process streaming audio and publish VAD events.
@@ -250,70 +589,17 @@ class VADService:
             frame_ms: Frame size in milliseconds (default 32ms = 512 samples at 16kHz)
         """
         # Silero VAD requires 512 samples for 16kHz (32ms) or 256 for 8kHz
-        frame_samples = 512 if self.vad.sample_rate == 16000 else 256
-        buffer = np.array([], dtype=np.int16)
-
-        last_speech_state = False
-        current_segment_start = None
+        frame_samples = self.vad.window_samples
 
         logger.info(
             f"Processing audio stream (frame_ms={frame_ms}, frame_samples={frame_samples})..."
         )
 
         for chunk in audio_generator:
-            # Add to buffer
-            buffer = np.concatenate([buffer, chunk])
-
-            # Process complete frames
-            while len(buffer) >= frame_samples:
-                frame = buffer[:frame_samples]
-                buffer = buffer[frame_samples:]
-
-                # Run VAD
-                result = self.vad.process_chunk(frame)
-                self.total_chunks += 1
-
-                # Detect state changes
-                if result["speech"] and not last_speech_state:
-                    # Speech started
-                    self.publish_vad_event(
-                        "speech_start", confidence=result["confidence"]
-                    )
-                    current_segment_start = self.total_chunks * frame_ms
-                    last_speech_state = True
-                    self.speech_chunks += 1
-                    logger.info(
-                        f"🎤 Speech detected (confidence={result['confidence']:.2f})"
-                    )
-
-                elif not result["speech"] and last_speech_state:
-                    # Speech ended
-                    current_segment_end = self.total_chunks * frame_ms
-                    self.publish_vad_event(
-                        "speech_end", confidence=result.get("confidence", 0.0)
-                    )
-                    # Publish segment summary
-                    self.publish_vad_event(
-                        "speech",
-                        confidence=result.get("confidence", 0.8),
-                        start_ms=current_segment_start,
-                        end_ms=current_segment_end,
-                    )
-                    last_speech_state = False
-                    logger.info(
-                        f"🔇 Speech ended (duration={(current_segment_end - current_segment_start) / 1000:.1f}s)"
-                    )
-
-                elif result["speech"]:
-                    # Continuing speech
-                    self.speech_chunks += 1
-
-                # Log progress periodically
-                if self.total_chunks % 100 == 0:
-                    speech_pct = (self.speech_chunks / self.total_chunks) * 100
-                    logger.info(
-                        f"Processed {self.total_chunks} chunks ({speech_pct:.1f}% speech)"
-                    )
+            # Process complete frames as soon as they are available
+            for frame in self._buffer_frames(chunk):
+                is_speech, confidence = self.vad.detect(frame)
+                self._handle_result(is_speech, confidence, frame_ms)
 
         logger.info(
             f"✓ Stream processing complete ({self.total_chunks} chunks, {self.speech_chunks} speech)"
@@ -363,13 +649,16 @@ def serial_audio_generator(port, baudrate=921600):
         logger.error("Failed to read WAV header")
         return
 
-    header = buffer[:44]
-    data_size = struct.unpack("<I", header[40:44])[0]
+    data_size = _U32LE(buffer, 40)[0]
     logger.info(f"WAV stream detected: {data_size} bytes expected")
 
     # Yield audio in chunks
     bytes_read = len(buffer) - 44
-    remaining_buffer = buffer[44:]
+    remaining_buffer = bytearray(buffer[44:])
+
+    # Yield whole 512-sample frames (required by Silero VAD for 16kHz)
+    samples_to_yield = 512
+    sample_bytes = samples_to_yield * 2
 
     while bytes_read < data_size:
         # Read more data
@@ -378,22 +667,22 @@ def serial_audio_generator(port, baudrate=921600):
         if not chunk:
             break
 
-        # Add to buffer
-        remaining_buffer += chunk
+        # Add to buffer (amortized O(1) append)
+        remaining_buffer.extend(chunk)
         bytes_read += len(chunk)
 
-        # Yield complete samples (2 bytes per sample)
-        # Yield in 512-sample chunks (required by Silero VAD for 16kHz)
-        samples_to_yield = 512
+        # Convert all complete frames with one copy, then drop them from the
+        # buffer (the copy releases the bytearray so it can be resized)
+        n_frames = len(remaining_buffer) // sample_bytes
+        if n_frames == 0:
+            continue
+        samples = np.frombuffer(
+            remaining_buffer, dtype=np.int16, count=n_frames * samples_to_yield
+        ).copy()
+        del remaining_buffer[: n_frames * sample_bytes]
 
-        while len(remaining_buffer) >= samples_to_yield * 2:
-            sample_bytes = samples_to_yield * 2
-
-            # Convert bytes to int16 array
-            samples = np.frombuffer(remaining_buffer[:sample_bytes], dtype=np.int16)
-            remaining_buffer = remaining_buffer[sample_bytes:]
-
-            yield samples
+        # Whole block at once; the consumer splits it into frames
+        yield samples
 
     ser.close()
     logger.info("Serial stream complete")
@@ -415,18 +704,22 @@ def wav_file_generator(filepath, chunk_samples=512):
 
         logger.info(f"Reading WAV file: {filepath}")
         logger.info(f"  Sample rate: {sample_rate} Hz, Channels: {n_channels}")
+        stereo = n_channels == 2
 
         while True:
             frames = wav.readframes(chunk_samples)
             if not frames:
                 break
 
-            # Convert to int16 array
+            # Convert to int16 array (a view over the frame bytes)
             samples = np.frombuffer(frames, dtype=np.int16)
 
-            # If stereo, take only one channel
-            if n_channels == 2:
-                samples = samples[::2]
+            # If stereo, downmix to mono by averaging the channels
+            if stereo:
+                pairs = samples.reshape(-1, 2)
+                samples = ((pairs[:, 0].astype(np.int32) + pairs[:, 1]) >> 1).astype(
+                    np.int16
+                )
 
             yield samples
 
@@ -445,6 +738,18 @@ def main():
         "--broker", default=Config.MQTT_BROKER, help="MQTT broker address"
     )
     parser.add_argument("--port", type=int, default=Config.MQTT_PORT, help="MQTT port")
+    parser.add_argument(
+        "--gate-dbfs",
+        type=float,
+        default=None,
+        help="Skip VAD inference on frames quieter than this RMS level (e.g. -55 dBFS)",
+    )
+    parser.add_argument(
+        "--gate-margin-db",
+        type=float,
+        default=None,
+        help="Also skip frames within this many dB of the tracked noise floor (e.g. 6)",
+    )
 
     args = parser.parse_args()
 
@@ -453,7 +758,11 @@ def main():
 
     # Initialize VAD service
     service = VADService(
-        mqtt_broker=args.broker, mqtt_port=args.port, device_id=args.device_id
+        mqtt_broker=args.broker,
+        mqtt_port=args.port,
+        device_id=args.device_id,
+        gate_dbfs=args.gate_dbfs,
+        gate_margin_db=args.gate_margin_db,
     )
 
     try:
@@ -1,51 +1,162 @@
 #!/usr/bin/env python3
 """Decision node: subscribes to noise_profile and issues actuation decisions."""
-import json
 import time
 import sys
 import os
 import logging
-from datetime import datetime
+import queue
+import threading
 
+import orjson
 import paho.mqtt.client as mqtt
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 import joblib
 
+# Optional: native predictor compiled from the forest by train.py --compile
+try:
+    import tl2cgen
+
+    TL2CGEN_AVAILABLE = True
+except ImportError:
+    TL2CGEN_AVAILABLE = False
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; the forest walk below then runs as plain Python
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
 # Add shared/utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../shared'))
 try:
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 except ImportError:
     # Fallback if running from root
     sys.path.append(os.path.join(os.getcwd(), 'shared'))
     from utils.config import Config
+    from utils.timestamps import utc_timestamp
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "model.joblib"
+MODEL_ARRAYS_PATH = "model.npz"
+COMPILED_MODEL_PATH = "librf.so"
+
+# The model takes a single scalar (mean_rms_db), so its response is tabulated
+# once at load time over this range/resolution (dB)
+LUT_LO, LUT_HI, LUT_STEP = -80.0, 20.0, 0.1
+
+def _is_current(path):
+    """True if a derived model file exists and is not older than model.joblib.
+
+    train.py only rewrites the artifacts it was asked for, so a librf.so or
+    model.npz left from an earlier run must not shadow a retrained model.
+    """
+    if not os.path.exists(path):
+        return False
+    if os.path.exists(MODEL_PATH) and os.path.getmtime(path) < os.path.getmtime(MODEL_PATH):
+        logger.warning(f"Ignoring {path}: older than {MODEL_PATH}")
+        return False
+    return True
+
+@njit(cache=True)
+def _walk(feature, threshold, left, right, value, roots, X):
+    """Average leaf value over all trees for each row of X (see train.export_arrays)."""
+    n_trees = roots.size
+    out = np.empty(X.shape[0])
+    for i in range(X.shape[0]):
+        s = 0.0
+        for t in range(n_trees):
+            node = roots[t]
+            while left[node] != -1:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            s += value[node]
+        out[i] = s / n_trees
+    return out
 
 class DecisionAgent:
     def __init__(self):
         self.model = None
+        self._predictor = None
+        self._forest = None
+        self._lut = None
         try:
-            if os.path.exists(MODEL_PATH):
+            if TL2CGEN_AVAILABLE and _is_current(COMPILED_MODEL_PATH):
+                self._predictor = tl2cgen.Predictor(COMPILED_MODEL_PATH)
+                n_features = self._predictor.num_feature
+                logger.info(f"Loaded compiled model from {COMPILED_MODEL_PATH}")
+            elif _is_current(MODEL_ARRAYS_PATH):
+                with np.load(MODEL_ARRAYS_PATH) as f:
+                    self._forest = tuple(
+                        f[k] for k in ("feature", "threshold", "left", "right", "value", "roots")
+                    )
+                    n_features = int(f["n_features"])
+                logger.info(f"Loaded forest arrays from {MODEL_ARRAYS_PATH}")
+            elif os.path.exists(MODEL_PATH):
                 self.model = joblib.load(MODEL_PATH)
+                n_features = self.model.n_features_in_
                 logger.info(f"Loaded model from {MODEL_PATH}")
             else:
                 logger.warning(f"Model file {MODEL_PATH} not found")
+                return
+            # Multi-feature models skip the LUT and predict directly
+            if n_features == 1:
+                self._lut = self._build_lut()
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             logger.info("Running with heuristic rules")
+            self.model = None
+            self._predictor = None
+            self._forest = None
+
+    @property
+    def has_model(self):
+        return (
+            self.model is not None
+            or self._predictor is not None
+            or self._forest is not None
+        )
+
+    def _predict(self, X):
+        """Predict a 1D array of scores with whichever model is loaded."""
+        if self._predictor is not None:
+            out = self._predictor.predict(tl2cgen.DMatrix(X.astype(np.float32)))
+            return out.reshape(len(X), -1)[:, 0]
+        if self._forest is not None:
+            # sklearn compares float32 features against float64 thresholds
+            X = X.astype(np.float32).astype(np.float64)
+            return _walk(*self._forest, X)
+        return self.model.predict(X)
+
+    def _build_lut(self):
+        """Tabulate model predictions so decide() is an array index, not predict()."""
+        xs = np.arange(LUT_LO, LUT_HI + LUT_STEP / 2, LUT_STEP).reshape(-1, 1)
+        lut = self._predict(xs).astype(np.float32)
+        logger.info(f"Built decision LUT ({lut.size} entries, {LUT_STEP} dB step)")
+        return lut
+
+    def _lookup(self, mean):
+        # Nearest entry, clamped to the tabulated range
+        idx = int((mean - LUT_LO) / LUT_STEP + 0.5)
+        idx = max(0, min(self._lut.size - 1, idx))
+        return float(self._lut[idx])
 
     def decide(self, profile_summary):
         # profile_summary is dict with mean_rms_db
         mean = profile_summary.get("mean_rms_db", 0.0)
-        if self.model is not None:
+        if self.has_model:
             try:
-                X = np.array([[mean]])
-                score = float(self.model.predict(X)[0])
+                if self._lut is not None:
+                    score = self._lookup(mean)
+                else:
+                    score = float(self._predict(np.array([[mean]]))[0])
                 source = "random_forest"
             except Exception as e:
                 logger.error(f"Prediction error: {e}")
@@ -66,7 +177,7 @@ class DecisionAgent:
         level = round(float(1.0 - score), 2)
         
         cmd = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": utc_timestamp(),
             "action": "set_volume",
             "level": level,
             "confidence": 1.0,
@@ -85,18 +196,43 @@ class DecisionService:
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
 
+        # Messages are processed off Paho's network thread
+        self._queue = queue.Queue(maxsize=1024)
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._drain, daemon=True)
+
     def on_connect(self, client, userdata, flags, rc):
         logger.info(f"Connected to MQTT broker with result code {rc}")
         client.subscribe(Config.TOPIC_NOISE_PROFILE)
         logger.info(f"Subscribed to {Config.TOPIC_NOISE_PROFILE}")
 
     def on_message(self, client, userdata, msg):
+        # Hand off and return so the socket read loop never blocks
         try:
-            payload = json.loads(msg.payload.decode())
+            self._queue.put_nowait(msg.payload)
+        except queue.Full:
+            logger.warning("Profile queue full, dropping message")
+
+    def _drain(self):
+        while not self._stop.is_set():
+            try:
+                raw = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._handle(raw)
+
+    def _handle(self, raw):
+        try:
+            payload = orjson.loads(raw)
             profile = payload.get("profile", {})
             cmd = self.agent.decide(profile)
             
-            client.publish(Config.TOPIC_ACTUATION_SPEAKER, json.dumps(cmd))
+            self.client.publish(
+                Config.TOPIC_ACTUATION_SPEAKER,
+                orjson.dumps(cmd),
+                qos=0,
+                retain=False,
+            )
             logger.info(f"Published actuation: {cmd}")
             
         except Exception as e:
@@ -106,11 +242,21 @@ class DecisionService:
         logger.info(f"Connecting to {Config.MQTT_BROKER}:{Config.MQTT_PORT}")
         try:
             self.client.connect(Config.MQTT_BROKER, Config.MQTT_PORT, 60)
-            self.client.loop_forever()
+            self._worker.start()
+            self.client.loop_start()
+            self._stop.wait()
         except KeyboardInterrupt:
             logger.info("Stopping decision service")
         except Exception as e:
             logger.error(f"Connection error: {e}")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker.is_alive():
+            self._worker.join(timeout=1.0)
+        self.client.loop_stop()
 
 if __name__ == "__main__":
     service = DecisionService()
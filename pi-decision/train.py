@@ -3,12 +3,54 @@
 Expect CSV with columns: mean_rms_db,target_noisiness
 """
 import argparse
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 import joblib
 
 
-def train(csv_path, model_out):
+def export_arrays(model, npz_out):
+    """Flatten the forest's node arrays into one .npz for decision.py.
+
+    Child indices are rebased so every tree shares the same node arrays;
+    `roots` holds the index of each tree's first node.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        roots.append(offset)
+        feature.append(tree.feature)
+        threshold.append(tree.threshold)
+        # Leaves are marked with -1 in both child arrays; keep them that way
+        left.append(np.where(tree.children_left < 0, -1, tree.children_left + offset))
+        right.append(np.where(tree.children_right < 0, -1, tree.children_right + offset))
+        value.append(tree.value[:, 0, 0])
+        offset += tree.node_count
+    np.savez(
+        npz_out,
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        value=np.concatenate(value).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        n_features=np.int32(model.n_features_in_),
+    )
+    print("Saved forest arrays to", npz_out)
+
+
+def compile_model(model, lib_out):
+    """Compile the forest to a native shared library for decision.py."""
+    import tl2cgen
+    import treelite
+
+    tl_model = treelite.sklearn.import_model(model)
+    tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=lib_out)
+    print("Saved compiled model to", lib_out)
+
+
+def train(csv_path, model_out, lib_out=None, arrays_out="model.npz"):
     df = pd.read_csv(csv_path)
     X = df[["mean_rms_db"]].values
     y = df["target_noisiness"].values
@@ -16,11 +58,25 @@ def train(csv_path, model_out):
     model.fit(X, y)
     joblib.dump(model, model_out)
     print("Saved model to", model_out)
+    if arrays_out:
+        export_arrays(model, arrays_out)
+    if lib_out:
+        compile_model(model, lib_out)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("csv")
     parser.add_argument("--out", default="model.joblib")
+    parser.add_argument(
+        "--arrays",
+        default="model.npz",
+        help="Flat forest arrays loaded by decision.py (empty string to skip)",
+    )
+    parser.add_argument(
+        "--compile",
+        metavar="LIB",
+        help="Also compile the forest to a native library (e.g. librf.so)",
+    )
     args = parser.parse_args()
-    train(args.csv, args.out)
+    train(args.csv, args.out, args.compile, args.arrays)
@@ -12,10 +12,16 @@ Usage:
 """
 
 import argparse
+import contextlib
 import os
+import platform
+import queue
+import selectors
+import struct
 import sys
+import threading
 import time
-import wave
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
@@ -26,6 +32,43 @@ except ImportError:
     print("ERROR: Missing dependencies. Run: pip install pyserial numpy")
     sys.exit(1)
 
+# WAV header fields are little-endian uint32
+_U32LE = struct.Struct("<I").unpack_from
+
+
+class PCMBuffer:
+    """Preallocated byte accumulator for a PCM stream.
+
+    Blocks are appended at the tail and consumed from the head; unread bytes
+    are moved back to the front only when the end of the buffer is reached.
+    """
+
+    def __init__(self, size=1 << 20):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def append(self, data):
+        n = len(data)
+        if self._tail + n > len(self._buf):
+            pending = self._tail - self._head
+            self._buf[:pending] = self._view[self._head : self._tail]
+            self._head, self._tail = 0, pending
+        self._buf[self._tail : self._tail + n] = data
+        self._tail += n
+
+    def peek(self, n=None):
+        """View of the next `n` unread bytes (all of them by default)."""
+        end = self._tail if n is None else min(self._tail, self._head + n)
+        return self._view[self._head : end]
+
+    def consume(self, n):
+        self._head += n
+
 
 class PCMCapture:
     """Capture raw PCM stream and save to audio files."""
@@ -34,6 +77,10 @@ class PCMCapture:
     CHANNELS = 1
     SAMPLE_WIDTH = 2  # 16-bit = 2 bytes
     BAUDRATE = 921600
+    # macOS _IOW('T', 0, unsigned long): serial receive latency
+    IOSSDATALAT = 0x80085400
+    # VAD mode: windows kept from before onset
+    VAD_PREROLL_FRAMES = 10
 
     def __init__(
         self,
@@ -43,6 +90,7 @@ class PCMCapture:
         duration=60,
         max_size=1024 * 1024,
         debug=False,
+        vad_backend=None,
     ):
         """Initialize PCM capture."""
         self.serial_port = serial_port
@@ -61,7 +109,13 @@ class PCMCapture:
                 )
                 from vad import SileroVAD
 
-                self.vad = SileroVAD(sample_rate=self.SAMPLE_RATE, device="cpu")
+                # One inference thread; the serial reader needs the other cores
+                self.vad = SileroVAD(
+                    sample_rate=self.SAMPLE_RATE,
+                    device="cpu",
+                    backend=vad_backend,
+                    num_threads=1,
+                )
             except ImportError:
                 print("ERROR: VAD mode requires Silero VAD. Run: just setup-vad")
                 sys.exit(1)
@@ -76,11 +130,18 @@ class PCMCapture:
         self.current_file = None
         self.current_file_samples = 0
         self.bytes_received = 0
+        # Bytes consumed by wait_for_data (Windows only) that belong to the stream
+        self._prefetched = b""
+        self._last_print_t = 0.0
 
-    def debug_print(self, msg):
-        """Print debug message if debug mode enabled."""
+    def debug_print(self, fmt, *args):
+        """Print debug message if debug mode enabled.
+
+        Formatting with `fmt % args` happens only when debug is on, so hot
+        loops can call this freely.
+        """
         if self.debug:
-            print(f"[DEBUG] {msg}")
+            print("[DEBUG] " + (fmt % args if args else fmt))
 
     def get_output_filename(self, prefix="recording"):
         """Generate timestamped output filename."""
@@ -88,29 +149,63 @@ class PCMCapture:
         filename = f"{prefix}_{timestamp}.wav"
         return self.output_dir / filename
 
+    def wav_header(self, data_bytes):
+        """Build the 44-byte PCM WAV header for `data_bytes` of samples."""
+        block_align = self.CHANNELS * self.SAMPLE_WIDTH
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF",
+            min(36 + data_bytes, 0xFFFFFFFF),
+            b"WAVE",
+            b"fmt ",
+            16,
+            1,  # PCM
+            self.CHANNELS,
+            self.SAMPLE_RATE,
+            self.SAMPLE_RATE * block_align,
+            block_align,
+            self.SAMPLE_WIDTH * 8,
+            b"data",
+            data_bytes,
+        )
+
     def create_wav_file(self):
-        """Create and return a new WAV file object."""
+        """Create a new WAV file and return its file descriptor.
+
+        The format is fixed, so the header is written once up front and PCM is
+        appended with plain os.write calls; sizes are patched on close.
+        """
         filepath = self.get_output_filename()
 
-        # Create WAV file
-        wav_file = wave.open(str(filepath), "wb")
-        wav_file.setnchannels(self.CHANNELS)
-        wav_file.setsampwidth(self.SAMPLE_WIDTH)
-        wav_file.setframerate(self.SAMPLE_RATE)
+        fd = os.open(str(filepath), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        # Placeholder sizes read as "until EOF" if the file is never closed
+        os.write(fd, self.wav_header(0xFFFFFFFF))
+        if self.mode == "time" and hasattr(os, "posix_fallocate"):
+            # Reserve the whole file up front so appends don't allocate
+            # extents; close_current_file trims it to the real length
+            try:
+                expected = self.duration * self.SAMPLE_RATE * self.SAMPLE_WIDTH
+                os.posix_fallocate(fd, 44, expected)
+            except OSError:
+                pass
 
-        self.current_file = (wav_file, filepath)
+        self.current_file = (fd, filepath)
         self.current_file_samples = 0
         self.file_count += 1
 
-        return wav_file
+        return fd
 
     def close_current_file(self):
         """Close current WAV file and print info."""
         if self.current_file is None:
             return
 
-        wav_file, filepath = self.current_file
-        wav_file.close()
+        fd, filepath = self.current_file
+        data_bytes = self.current_file_samples * self.SAMPLE_WIDTH
+        os.pwrite(fd, struct.pack("<I", 36 + data_bytes), 4)
+        os.pwrite(fd, struct.pack("<I", data_bytes), 40)
+        os.ftruncate(fd, 44 + data_bytes)
+        os.close(fd)
 
         duration = self.current_file_samples / self.SAMPLE_RATE
         size = filepath.stat().st_size
@@ -127,6 +222,7 @@ class PCMCapture:
         try:
             ser = serial.Serial(self.serial_port, baudrate=self.BAUDRATE, timeout=2)
             print(f"✓ Connected to {self.serial_port} at {self.BAUDRATE} baud")
+            self.enable_low_latency(ser)
             return ser
         except serial.SerialException as e:
             print(f"❌ ERROR: Failed to connect to {self.serial_port}")
@@ -137,6 +233,26 @@ class PCMCapture:
             print(f"  3. Test connection: just check")
             return None
 
+    def enable_low_latency(self, ser):
+        """Disable the USB-serial latency timer (16 ms on FTDI) where supported."""
+        system = platform.system()
+        try:
+            if system == "Linux":
+                # Sets ASYNC_LOW_LATENCY via TIOCGSERIAL/TIOCSSERIAL
+                ser.set_low_latency_mode(True)
+            elif system == "Darwin":
+                import fcntl
+
+                # Receive latency in microseconds
+                fcntl.ioctl(ser.fd, self.IOSSDATALAT, struct.pack("L", 1))
+            else:
+                return
+            self.debug_print("Serial low-latency mode enabled")
+        except (AttributeError, OSError, ValueError) as e:
+            # Driver doesn't support it; capture still works, just with
+            # coarser read wakeups
+            self.debug_print("Low-latency mode unavailable: %s", e)
+
     def send_trigger(self, ser):
         """Send trigger to ESP32."""
         time.sleep(0.5)
@@ -151,26 +267,35 @@ class PCMCapture:
         print(f"\n⏳ Waiting for audio data (timeout: {timeout}s)...")
         start = time.time()
 
-        # Try to read existing data first
-        time.sleep(0.2)
-        available = ser.in_waiting
-        if available > 0:
-            self.debug_print(f"Data already available: {available} bytes")
-            print(f"✓ Receiving audio data ({available} bytes waiting)...")
-            return True
-
-        while time.time() - start < timeout:
-            available = ser.in_waiting
-            if available > 0:
-                self.debug_print(f"Data available: {available} bytes")
-                print(f"✓ Receiving audio data ({available} bytes waiting)...")
-                return True
-
-            elapsed = time.time() - start
-            if int(elapsed) % 2 == 0 and elapsed == int(elapsed):
-                print(f"  Still waiting... {elapsed:.0f}s elapsed")
-
-            time.sleep(0.1)
+        fd = getattr(ser, "fd", None)
+        if fd is not None:
+            # Let the kernel wake us on the first byte; nothing is consumed
+            with selectors.DefaultSelector() as sel:
+                sel.register(fd, selectors.EVENT_READ)
+                while (left := timeout - (time.time() - start)) > 0:
+                    # 2 s slices keep the "still waiting" feedback
+                    if sel.select(timeout=min(2.0, left)):
+                        available = ser.in_waiting
+                        self.debug_print("Data available: %d bytes", available)
+                        print(f"✓ Receiving audio data ({available} bytes waiting)...")
+                        return True
+                    print(f"  Still waiting... {time.time() - start:.0f}s elapsed")
+        else:
+            # No selectable fd (Windows): block on the first byte instead
+            ser.timeout = 1.0
+            while time.time() - start < timeout:
+                first = ser.read(1)
+                if first:
+                    # Drain whatever else has arrived; the capture loop starts from it
+                    self._prefetched = first + ser.read(ser.in_waiting)
+                    available = len(self._prefetched)
+                    self.debug_print("Data available: %d bytes", available)
+                    print(f"✓ Receiving audio data ({available} bytes waiting)...")
+                    return True
+
+                elapsed = time.time() - start
+                if int(elapsed) % 2 == 0:
+                    print(f"  Still waiting... {elapsed:.0f}s elapsed")
 
         print(f"\n❌ ERROR: No data received from ESP32 after {timeout} seconds")
         print("\nTroubleshooting:")
@@ -189,81 +314,280 @@ class PCMCapture:
         print(f"Output directory: {self.output_dir}")
         print(f"{'=' * 70}\n")
 
-        pcm_buffer = b""
-        frame_samples = 512
-        frame_bytes = frame_samples * 2
-
-        file_start_time = None
-        last_data_time = time.time()
-        data_timeout = 5  # seconds without data before warning
+        bytes_per_sec = self.SAMPLE_RATE * self.SAMPLE_WIDTH
+        # Files are split on sample count, so each holds exactly `duration`
+        # seconds of audio; data is written about a second at a time
+        file_bytes = self.duration * bytes_per_sec
+        batch_bytes = bytes_per_sec
+        pcm = PCMBuffer()
 
         try:
-            while True:
-                # Read from serial
-                available = ser.in_waiting
-                if available > 0:
-                    data = ser.read(min(available, 4096))
-                    pcm_buffer += data
-                    self.bytes_received += len(data)
-                    last_data_time = time.time()
-
-                    self.debug_print(
-                        f"Received {len(data)} bytes, buffer: {len(pcm_buffer)} bytes"
-                    )
-
-                # Check for data timeout
-                if time.time() - last_data_time > data_timeout:
-                    print(
-                        f"\n⚠️  WARNING: No data for {data_timeout}s. Stream may have stopped."
-                    )
-                    if self.bytes_received == 0:
-                        print("   No data received at all. Check firmware/connection.")
-                        break
-                    last_data_time = time.time()  # Reset timer
-
-                # Open file if needed
-                if self.current_file is None:
-                    wav = self.create_wav_file()
-                    file_start_time = time.time()
-                    print(f"\n🔴 Recording started... ({self.duration}s)")
-
-                # Process complete frames
-                while len(pcm_buffer) >= frame_bytes:
-                    frame_data = pcm_buffer[:frame_bytes]
-                    pcm_buffer = pcm_buffer[frame_bytes:]
-
-                    # Convert to samples
-                    samples = np.frombuffer(frame_data, dtype=np.int16)
-                    wav_file, _ = self.current_file
-                    wav_file.writeframes(samples.tobytes())
-
-                    self.current_file_samples += frame_samples
-                    self.total_samples += frame_samples
-
-                    # Check if duration exceeded
-                    elapsed = time.time() - file_start_time
-                    if elapsed >= self.duration:
+            with contextlib.closing(self.receive(ser)) as blocks:
+                for block in blocks:
+                    pcm.append(block)
+
+                    # Open file if needed
+                    if self.current_file is None:
+                        self.create_wav_file()
+                        print(f"\n🔴 Recording started... ({self.duration}s)")
+
+                    # Write once a batch is ready or the file is complete
+                    written = self.current_file_samples * self.SAMPLE_WIDTH
+                    if written + len(pcm) >= file_bytes:
+                        pcm.consume(self.write_samples(pcm.peek(file_bytes - written)))
                         self.close_current_file()
-                        break
+                    elif len(pcm) >= batch_bytes:
+                        pcm.consume(self.write_samples(pcm.peek()))
+                        self.print_progress()
 
-                    # Print progress every second
-                    if self.current_file_samples % self.SAMPLE_RATE == 0:  # Every 1s
-                        remaining = self.duration - elapsed
-                        print(
-                            f"\r  Recording... {elapsed:.1f}s / {self.duration}s (remaining: {remaining:.1f}s)",
-                            end="",
-                            flush=True,
-                        )
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Capture stopped by user")
+        finally:
+            # Also runs when the stream ends or the reader dies, so the
+            # header sizes are patched and the file trimmed to its data
+            if self.current_file is not None:
+                self.write_samples(pcm.peek())
+                self.close_current_file()
 
-                # Small sleep to prevent busy-waiting
-                if available == 0:
-                    time.sleep(0.001)
+    def capture_vad(self, ser):
+        """Capture with VAD-based splitting: one file per detected utterance."""
+        print(f"\n{'=' * 70}")
+        print(f"📊 VAD CAPTURE MODE")
+        print(f"{'=' * 70}")
+        print(f"VAD backend: {self.vad.backend}")
+        print(f"Output directory: {self.output_dir}")
+        print(f"{'=' * 70}\n")
+
+        frame_bytes = self.vad.window_samples * self.SAMPLE_WIDTH
+        # Detection lags the onset slightly, so keep a little audio from
+        # before the start event
+        preroll = deque(maxlen=self.VAD_PREROLL_FRAMES)
+        pcm = PCMBuffer()
+
+        print("👂 Listening for speech...")
+        try:
+            with contextlib.closing(self.receive(ser)) as blocks:
+                for block in blocks:
+                    pcm.append(block)
+
+                    # Classify each window as soon as it is complete
+                    while len(pcm) >= frame_bytes:
+                        frame = pcm.peek(frame_bytes)
+                        samples = np.frombuffer(frame, dtype=np.int16)
+                        result = self.vad.process_chunk(samples)
+                        if self.current_file is None:
+                            if result.get("event") == "start":
+                                self.create_wav_file()
+                                print(f"\n🗣️  Speech started ({result['confidence']:.2f})")
+                                for prev in preroll:
+                                    self.write_samples(prev)
+                                preroll.clear()
+                                self.write_samples(frame)
+                            else:
+                                preroll.append(bytes(frame))
+                        else:
+                            self.write_samples(frame)
+                            if result.get("end_ms") is not None:
+                                # Only the iterator's end boundary, which waits
+                                # out min_silence_duration_ms, closes the file;
+                                # brief dips inside an utterance don't
+                                self.close_current_file()
+                                print("👂 Listening for speech...")
+                        del samples, frame
+                        pcm.consume(frame_bytes)
 
         except KeyboardInterrupt:
             print("\n\n⚠️  Capture stopped by user")
+        finally:
+            # Also runs when the stream ends or the reader dies, so the
+            # header sizes are patched and the file trimmed to its data
             if self.current_file is not None:
+                self.write_samples(pcm.peek())
                 self.close_current_file()
 
+    def receive(self, ser, data_timeout=5):
+        """Yield raw serial blocks, read on a separate thread, until the stream ends.
+
+        A reader thread owns the serial port so disk stalls in the consumer
+        can't leave the UART unserviced; ~8 s of audio can queue up.
+        """
+        if self._prefetched:
+            block, self._prefetched = self._prefetched, b""
+            self.bytes_received += len(block)
+            yield block
+
+        blocks = queue.Queue(maxsize=64)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read_serial, args=(ser, blocks, stop), daemon=True
+        )
+        reader.start()
+
+        last_data_time = time.time()
+        try:
+            while True:
+                try:
+                    block = blocks.get(timeout=0.1)
+                except queue.Empty:
+                    if not reader.is_alive():
+                        return
+                    # Check for data timeout
+                    if time.time() - last_data_time > data_timeout:
+                        print(
+                            f"\n⚠️  WARNING: No data for {data_timeout}s. Stream may have stopped."
+                        )
+                        if self.bytes_received == 0:
+                            print("   No data received at all. Check firmware/connection.")
+                            return
+                        last_data_time = time.time()  # Reset timer
+                    continue
+
+                self.bytes_received += len(block)
+                last_data_time = time.time()
+                self.debug_print("Received %d bytes", len(block))
+                yield block
+        finally:
+            stop.set()
+            reader.join(timeout=1.0)
+
+    def print_progress(self):
+        """Update the progress line, at most once per wall-clock second.
+
+        Batches can arrive back to back when the writer catches up after a
+        stall, so the terminal write is rate limited rather than per batch.
+        """
+        now = time.monotonic()
+        if now - self._last_print_t < 1.0:
+            return
+        self._last_print_t = now
+        elapsed = self.current_file_samples / self.SAMPLE_RATE
+        remaining = self.duration - elapsed
+        print(
+            f"\r  Recording... {elapsed:.1f}s / {self.duration}s (remaining: {remaining:.1f}s)",
+            end="",
+            flush=True,
+        )
+
+    def _read_serial(self, ser, blocks, stop, read_size=4096):
+        """Reader thread: push raw serial blocks onto `blocks` until `stop` is set."""
+        # Reads block until read_size bytes arrive or the timeout expires, so
+        # the thread wakes on data rather than on a sleep
+        ser.timeout = 0.05
+        buf = bytearray(read_size)
+        while not stop.is_set():
+            try:
+                n = ser.readinto(buf)
+            except serial.SerialException as e:
+                print(f"\n❌ Serial read error: {e}")
+                return
+            if n:
+                blocks.put(bytes(buf[:n]))
+
+    def write_samples(self, data):
+        """Write the whole samples in `data` to the current file in one call.
+
+        Returns the number of bytes consumed; an odd trailing byte is left
+        for the next call.
+        """
+        nbytes = len(data) // self.SAMPLE_WIDTH * self.SAMPLE_WIDTH
+        if nbytes:
+            fd, _ = self.current_file
+            out = data[:nbytes]
+            while out:
+                out = out[os.write(fd, out) :]
+            samples = nbytes // self.SAMPLE_WIDTH
+            self.current_file_samples += samples
+            self.total_samples += samples
+        return nbytes
+
+    def capture_wav_passthrough(self, ser, output_file, header_timeout=20):
+        """Save a WAV stream sent by the ESP32 (RIFF header, then samples) as-is.
+
+        Used by capture_wav.py for the mictest firmware, which frames its own
+        recording instead of streaming raw PCM.
+        """
+        print("Searching for WAV header...")
+        ser.timeout = 0.1
+        deadline = time.time() + header_timeout
+        # Only each new chunk plus the last 3 bytes of the previous one are
+        # scanned, so a signature split across reads is still found
+        carry = b""
+        total = 0
+        while True:
+            chunk = ser.read(512)
+            window = carry + chunk
+            idx = window.find(b"RIFF")
+            if idx >= 0:
+                skipped = total - len(carry) + idx
+                break
+            total += len(chunk)
+            carry = window[-3:]
+            if time.time() > deadline:
+                print("ERROR: Timeout waiting for RIFF header")
+                print(f"Read {total} bytes total")
+                return False
+        print(f"✓ Found RIFF header (skipped {skipped} bytes)")
+
+        # The rest of the 44-byte header; anything read past it is audio
+        ser.timeout = 5
+        pending = window[idx:]
+        if len(pending) < 44:
+            pending += ser.read(44 - len(pending))
+        header, pending = pending[:44], pending[44:]
+        if len(header) < 44:
+            print(f"ERROR: Incomplete WAV header: {header.hex()}")
+            return False
+        print(f"✓ WAV header received ({len(header)} bytes)")
+
+        data_size = _U32LE(header, 40)[0]
+        bytes_per_sec = self.SAMPLE_RATE * self.SAMPLE_WIDTH
+        print(f"Expected data size: {data_size} bytes")
+        print(f"Expected duration: {data_size / bytes_per_sec:.1f} seconds at 16kHz 16-bit mono")
+
+        print("Reading audio samples...")
+        buf = bytearray(65536)
+        view = memoryview(buf)
+        bytes_read = 0
+        fd = os.open(str(output_file), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, header)
+            if hasattr(os, "posix_fallocate"):
+                # The final size is known from the header; reserve it up front
+                try:
+                    os.posix_fallocate(fd, 44, data_size)
+                except OSError:
+                    pass
+            pending = pending[:data_size]
+            if pending:
+                os.write(fd, pending)
+                bytes_read = len(pending)
+            while bytes_read < data_size:
+                n = ser.readinto(view[: min(len(buf), data_size - bytes_read)])
+                if not n:
+                    print(f"\nWARNING: Unexpected end of data. Read {bytes_read} of {data_size} bytes")
+                    break
+                out = view[:n]
+                while out:
+                    out = out[os.write(fd, out) :]
+                bytes_read += n
+                self.bytes_received += n
+
+                percent = (bytes_read / data_size) * 100
+                print(f"  Progress: {percent:.1f}% ({bytes_read}/{data_size} bytes)", end="\r")
+            if bytes_read < data_size:
+                # Short stream: make the header match what was actually saved
+                os.pwrite(fd, struct.pack("<I", 36 + bytes_read), 4)
+                os.pwrite(fd, struct.pack("<I", bytes_read), 40)
+                os.ftruncate(fd, 44 + bytes_read)
+        finally:
+            os.close(fd)
+        print()
+
+        print(f"✓ WAV file saved: {output_file}")
+        print(f"  File size: {44 + bytes_read} bytes")
+        print(f"  Duration: {bytes_read / bytes_per_sec:.1f} seconds")
+        return True
+
     def print_summary(self):
         """Print capture summary."""
         if self.total_samples == 0:
@@ -313,6 +637,8 @@ class PCMCapture:
 
             if self.mode == "time":
                 self.capture_time_based(ser)
+            elif self.mode == "vad":
+                self.capture_vad(ser)
             else:
                 print(f"ERROR: Mode '{self.mode}' not yet implemented")
                 return False
@@ -375,6 +701,13 @@ def main():
         help="Serial baud rate (default: 921600)",
     )
 
+    parser.add_argument(
+        "--vad-backend",
+        choices=["onnx", "torch"],
+        default=None,
+        help="Silero VAD backend for vad mode (default: onnx if installed)",
+    )
+
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -391,6 +724,7 @@ def main():
         duration=args.duration,
         max_size=args.max_size,
         debug=args.debug,
+        vad_backend=args.vad_backend,
     )
 
     try:
@@ -24,20 +24,28 @@ import time
 
 import serial
 
+# Silence after which a command reply is taken to be complete
+REPLY_GAP_S = 0.05
+
 
 def send_command(ser, command):
     """Send a command to ESP32 and get response."""
     try:
         ser.write(command.encode() + b"\n")
         ser.flush()
-        time.sleep(0.2)  # Wait for response
-
-        # Read response
-        response = ""
-        while ser.in_waiting > 0:
-            response += ser.read(1).decode("utf-8", errors="ignore")
 
-        return response
+        # Wait up to ser.timeout for the reply to start, then keep reading
+        # until the line has been quiet for REPLY_GAP_S
+        response = ser.read(1)
+        if response:
+            timeout = ser.timeout
+            ser.timeout = REPLY_GAP_S
+            try:
+                while chunk := ser.read(ser.in_waiting or 1):
+                    response += chunk
+            finally:
+                ser.timeout = timeout
+        return response.decode("utf-8", errors="ignore")
     except Exception as e:
         print(f"Error: {e}")
         return None
@@ -137,7 +145,11 @@ def main():
 
     # Open serial connection
     try:
-        ser = serial.Serial(args.port, baudrate=args.baudrate, timeout=2)
+        ser = serial.Serial(
+            args.port,
+            baudrate=args.baudrate,
+            timeout=2,
+        )
         print(f"✅ Connected to {args.port} at {args.baudrate} baud\n")
     except Exception as e:
         print(f"❌ Failed to connect to {args.port}: {e}")
@@ -1,27 +1,30 @@
 #!/usr/bin/env python3
 """Publish simulated ESP32 messages to MQTT for testing."""
-import json
 import time
-import random
 import sys
 import os
-from datetime import datetime
 
+import numpy as np
+import orjson
 import paho.mqtt.client as mqtt
 
 # Add shared/utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../shared'))
 try:
     from utils.config import Config
+    from utils.timestamps import utc_timestamp_ms
 except ImportError:
     # Fallback if running from root
     sys.path.append(os.path.join(os.getcwd(), 'shared'))
     from utils.config import Config
+    from utils.timestamps import utc_timestamp_ms
 
 CLIENT = mqtt.Client()
 CLIENT.connect(Config.MQTT_BROKER, Config.MQTT_PORT, 60)
 
-NODE = "node1"
+# Number of simulated nodes (node1..nodeN); raise for load testing
+NUM_NODES = int(os.getenv("SIM_NODES", 1))
+NODES = [f"node{i + 1}" for i in range(NUM_NODES)]
 
 # Helper to construct topic from pattern
 # Config.TOPIC_AUDIO_FEATURES is "classroom/{ROOM_ID}/esp32/+/audio/features"
@@ -29,44 +32,62 @@ NODE = "node1"
 def get_topic(pattern, node_id):
     return pattern.replace('+', node_id)
 
+TOPICS_AUDIO = [get_topic(Config.TOPIC_AUDIO_FEATURES, n) for n in NODES]
+TOPICS_PIR = [get_topic(Config.TOPIC_PIR, n) for n in NODES]
+TOPICS_ENV = [get_topic(Config.TOPIC_ENV, n) for n in NODES]
+INTERVAL_S = 2.0
+
+RNG = np.random.default_rng()
+
+# Payloads are reused; only the per-node/per-tick fields are overwritten
+audio_payload = {"timestamp": "", "device_id": "", "sample_window_ms": 100, "rms_db": 0.0, "peak_db": 0.0}
+pir_payload = {"timestamp": "", "device_id": "", "motion": False}
+env_payload = {"timestamp": "", "device_id": "", "temperature_c": 0.0, "humidity_pct": 0.0}
+
+# Network I/O runs on Paho's background thread
+CLIENT.loop_start()
+
 try:
-    print(f"Publishing to {Config.MQTT_BROKER} for room {Config.ROOM_ID}...")
+    print(f"Publishing to {Config.MQTT_BROKER} for room {Config.ROOM_ID} ({NUM_NODES} nodes)...")
+    next_tick = time.monotonic()
     while True:
-        rms = random.uniform(-60, -20)
-        payload = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "device_id": NODE,
-            "sample_window_ms": 100,
-            "rms_db": rms,
-            "peak_db": rms + random.uniform(0, 3)
-        }
-        
-        topic_audio = get_topic(Config.TOPIC_AUDIO_FEATURES, NODE)
-        CLIENT.publish(topic_audio, json.dumps(payload))
-        
-        # PIR
-        pir_payload = {
-            "timestamp": datetime.utcnow().isoformat(), 
-            "device_id": NODE, 
-            "motion": random.choice([True, False])
-        }
-        topic_pir = get_topic(Config.TOPIC_PIR, NODE)
-        CLIENT.publish(topic_pir, json.dumps(pir_payload))
-        
+        # One timestamp shared by every message in this tick
+        now = utc_timestamp_ms()
+        audio_payload["timestamp"] = pir_payload["timestamp"] = env_payload["timestamp"] = now
+
+        # Draw every node's readings for this tick at once
+        rms = RNG.uniform(-60, -20, NUM_NODES)
+        peak = rms + RNG.uniform(0, 3, NUM_NODES)
+        motion = RNG.random(NUM_NODES) < 0.5
         # Env (occasional)
-        if random.random() < 0.1:
-            env_payload = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "device_id": NODE,
-                "temperature_c": random.uniform(20, 25),
-                "humidity_pct": random.uniform(40, 60)
-            }
-            topic_env = get_topic(Config.TOPIC_ENV, NODE)
-            CLIENT.publish(topic_env, json.dumps(env_payload))
-            print("Published env")
+        send_env = RNG.random(NUM_NODES) < 0.1
+        temperature = RNG.uniform(20, 25, NUM_NODES)
+        humidity = RNG.uniform(40, 60, NUM_NODES)
 
-        print(f"Published audio/pir for {NODE}")
-        time.sleep(2)
+        for i, node in enumerate(NODES):
+            audio_payload["device_id"] = node
+            audio_payload["rms_db"] = float(rms[i])
+            audio_payload["peak_db"] = float(peak[i])
+            CLIENT.publish(TOPICS_AUDIO[i], orjson.dumps(audio_payload), qos=0)
+
+            # PIR
+            pir_payload["device_id"] = node
+            pir_payload["motion"] = bool(motion[i])
+            CLIENT.publish(TOPICS_PIR[i], orjson.dumps(pir_payload), qos=0)
+
+            if send_env[i]:
+                env_payload["device_id"] = node
+                env_payload["temperature_c"] = float(temperature[i])
+                env_payload["humidity_pct"] = float(humidity[i])
+                CLIENT.publish(TOPICS_ENV[i], orjson.dumps(env_payload), qos=0)
+                print(f"Published env for {node}")
+
+        print(f"Published audio/pir for {NUM_NODES} node(s)")
+        # Sleep to the next tick so publish time doesn't drift the schedule
+        next_tick += INTERVAL_S
+        time.sleep(max(0.0, next_tick - time.monotonic()))
 except KeyboardInterrupt:
     print("\nStopping simulator")
-
+finally:
+    CLIENT.loop_stop()
+    CLIENT.disconnect()
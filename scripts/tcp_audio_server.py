@@ -5,6 +5,9 @@ TCP Audio Server for ESP32 PCM Streaming
 Receives raw 16-bit PCM audio from ESP32 over TCP and saves to WAV files.
 Supports real-time streaming and command handling.
 
+The server disables Nagle and acks immediately; the ESP32 firmware should
+set TCP_NODELAY on its socket too so small frames are not held back.
+
 Usage:
   python tcp_audio_server.py                    # Listen on all interfaces
   python tcp_audio_server.py --host 10.45.232.125  # Specific IP
@@ -14,11 +17,10 @@ Usage:
 
 import argparse
 import os
+import selectors
 import socket
 import struct
-import threading
 import time
-import wave
 from datetime import datetime
 from pathlib import Path
 
@@ -29,7 +31,11 @@ class TCPAudioServer:
     SAMPLE_RATE = 16000
     CHANNELS = 1
     SAMPLE_WIDTH = 2  # 16-bit
-    BUFFER_SIZE = 4096
+    BUFFER_SIZE = 65536
+    SOCKET_RCVBUF = 1 << 20
+    # Bytes the kernel queues before the client socket reports readable
+    RECV_LOWAT = 16384
+    WRITE_FLUSH_BYTES = 64 * 1024
 
     def __init__(self, host="0.0.0.0", port=8080, output_dir="./recordings"):
         self.host = host
@@ -38,11 +44,17 @@ class TCPAudioServer:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         self.server_socket = None
+        self.selector = None
         self.client_socket = None
         self.client_address = None
         self.is_running = False
         self.is_recording = False
-        self.current_wav_file = None
+        self.current_wav_fd = None
+        self._bytes_written = 0
+        self._write_buf = bytearray()
+        self._bytes_received = 0
+        self._recv_buf = bytearray(self.BUFFER_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
         self.total_samples = 0
         self.session_start_time = None
 
@@ -53,25 +65,28 @@ class TCPAudioServer:
         print(f"   Expected: 16kHz 16-bit mono PCM")
 
     def start(self):
-        """Start the TCP server."""
+        """Start the TCP server and run its event loop until stopped."""
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind((self.host, self.port))
             self.server_socket.listen(1)
+            self.server_socket.setblocking(False)
+
+            # One thread waits on readiness of the listening and client
+            # sockets; each registration carries its handler
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(
+                self.server_socket, selectors.EVENT_READ, self._accept_connection
+            )
 
             self.is_running = True
             print(f"\n🔄 Server listening on {self.host}:{self.port}")
             print("   Waiting for ESP32 connection...")
 
-            # Start accept thread
-            accept_thread = threading.Thread(target=self._accept_connections)
-            accept_thread.daemon = True
-            accept_thread.start()
-
-            # Keep main thread alive
             while self.is_running:
-                time.sleep(1)
+                for key, _ in self.selector.select():
+                    key.data()
 
         except KeyboardInterrupt:
             print("\n⚠️  Server shutdown requested")
@@ -95,90 +110,160 @@ class TCPAudioServer:
             self.server_socket.close()
             self.server_socket = None
 
+        if self.selector:
+            self.selector.close()
+            self.selector = None
+
         print("🛑 Server stopped")
 
-    def _accept_connections(self):
-        """Accept incoming connections."""
-        while self.is_running:
-            try:
-                self.client_socket, self.client_address = self.server_socket.accept()
-                print(
-                    f"\n✅ ESP32 connected from {self.client_address[0]}:{self.client_address[1]}"
-                )
-
-                # Start handling client
-                self._handle_client()
-
-            except OSError:
-                # Socket was closed
-                break
-            except Exception as e:
-                print(f"❌ Connection error: {e}")
-                time.sleep(1)
-
-    def _handle_client(self):
-        """Handle client connection and data reception."""
+    def _accept_connection(self):
+        """Accept a connection; the listener is paused while a client is served."""
+        try:
+            self.client_socket, self.client_address = self.server_socket.accept()
+        except BlockingIOError:
+            return
+        # A deep kernel queue absorbs Wi-Fi bursts from the ESP32 while
+        # we are busy writing
+        self.client_socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, self.SOCKET_RCVBUF
+        )
+        # Anything sent back (commands) goes out immediately
+        self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._quickack()
+        # Batch wakeups: ~0.5s of audio per select/recv pair instead of one
+        # per Wi-Fi segment. Linux honours this in poll/epoll; where it is
+        # unsupported the server just wakes more often
+        try:
+            self.client_socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVLOWAT, self.RECV_LOWAT
+            )
+        except (AttributeError, OSError):
+            pass
+        self.client_socket.setblocking(False)
+        print(
+            f"\n✅ ESP32 connected from {self.client_address[0]}:{self.client_address[1]}"
+        )
+
+        # Further connections wait in the backlog until this one closes
+        self.selector.unregister(self.server_socket)
+        self.selector.register(
+            self.client_socket, selectors.EVENT_READ, self._receive_audio
+        )
+
         self.session_start_time = time.time()
         self.total_samples = 0
 
         print("🎤 Ready to receive audio data...")
         print("   Send 'S' to ESP32 to start streaming")
 
+    def _quickack(self):
+        """Ack received segments immediately (Linux only).
+
+        Delayed ACKs would stall a sender that still runs Nagle. The kernel
+        drops back to delayed ACKs on its own, so this is re-armed per recv.
+        """
         try:
-            while self.is_running and self.client_socket:
-                # Check for data
-                data = self.client_socket.recv(self.BUFFER_SIZE)
+            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        except (AttributeError, OSError):
+            pass
 
-                if not data:
-                    # Connection closed
-                    print("📴 ESP32 disconnected")
-                    break
+    def _receive_audio(self):
+        """Read whatever the client socket has ready."""
+        try:
+            # Receive into the reusable buffer; _process_audio_data
+            # copies what it keeps before the next recv overwrites it
+            n = self.client_socket.recv_into(self._recv_view)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"❌ Client handling error: {e}")
+            self._close_client()
+            return
 
-                # Process audio data
-                self._process_audio_data(data)
+        if not n:
+            # Connection closed
+            print("📴 ESP32 disconnected")
+            self._close_client()
+            return
+        self._quickack()
 
+        # Process audio data
+        try:
+            self._process_audio_data(self._recv_view[:n])
         except Exception as e:
             print(f"❌ Client handling error: {e}")
-        finally:
-            if self.is_recording:
-                self._stop_recording()
-            if self.client_socket:
-                self.client_socket.close()
-                self.client_socket = None
-            print("🔌 Client connection closed")
+            self._close_client()
+
+    def _close_client(self):
+        """Finish the recording, drop the client and resume accepting."""
+        if self.is_recording:
+            self._stop_recording()
+        if self.client_socket:
+            self.selector.unregister(self.client_socket)
+            self.client_socket.close()
+            self.client_socket = None
+        self.selector.register(
+            self.server_socket, selectors.EVENT_READ, self._accept_connection
+        )
+        print("🔌 Client connection closed")
 
     def _process_audio_data(self, data):
         """Process incoming audio data."""
-        if len(data) % 2 != 0:
-            print(
-                f"⚠️  Warning: Received odd number of bytes ({len(data)}), expected even"
-            )
-            return
-
-        num_samples = len(data) // 2
-
         # Start recording if not already
         if not self.is_recording:
             self._start_recording()
 
         # Write to WAV file
-        if self.current_wav_file:
-            # Convert bytes to samples and write
-            samples = []
-            for i in range(0, len(data), 2):
-                sample = struct.unpack("<h", data[i : i + 2])[0]
-                samples.append(sample)
-
-            self.current_wav_file.writeframes(
-                struct.pack("<" + "h" * len(samples), *samples)
-            )
-            self.total_samples += len(samples)
+        if self.current_wav_fd is not None:
+            # The stream is already little-endian int16, the WAV on-disk
+            # format, so it goes to the file untouched. Chunks are
+            # coalesced so the file sees one write per WRITE_FLUSH_BYTES.
+            # TCP may split a sample across recvs; its first byte waits in
+            # the buffer for the second
+            self._write_buf += data
+            self._bytes_received += len(data)
+            if len(self._write_buf) >= self.WRITE_FLUSH_BYTES:
+                self._flush_audio()
+            prev_sec = self.total_samples // self.SAMPLE_RATE
+            self.total_samples = self._bytes_received // self.SAMPLE_WIDTH
 
             # Progress update every 1 second worth of audio
-            if self.total_samples % self.SAMPLE_RATE == 0:
+            if self.total_samples // self.SAMPLE_RATE != prev_sec:
                 duration = self.total_samples / self.SAMPLE_RATE
                 print(f"🎵 Recording... {duration:.1f}s ({self.total_samples} samples)")
 
+    def _flush_audio(self):
+        """Append buffered whole samples to the WAV file in one write."""
+        n = len(self._write_buf) - len(self._write_buf) % self.SAMPLE_WIDTH
+        if n:
+            with memoryview(self._write_buf) as view:
+                out = view[:n]
+                while out:
+                    out = out[os.write(self.current_wav_fd, out) :]
+                del out
+            del self._write_buf[:n]
+            self._bytes_written += n
+
+    def wav_header(self, data_bytes):
+        """Build the 44-byte PCM WAV header for `data_bytes` of samples."""
+        block_align = self.CHANNELS * self.SAMPLE_WIDTH
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF",
+            min(36 + data_bytes, 0xFFFFFFFF),
+            b"WAVE",
+            b"fmt ",
+            16,
+            1,  # PCM
+            self.CHANNELS,
+            self.SAMPLE_RATE,
+            self.SAMPLE_RATE * block_align,
+            block_align,
+            self.SAMPLE_WIDTH * 8,
+            b"data",
+            data_bytes,
+        )
+
     def _start_recording(self):
         """Start recording to a new WAV file."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -186,23 +271,29 @@ class TCPAudioServer:
         filepath = self.output_dir / filename
 
         try:
-            self.current_wav_file = wave.open(str(filepath), "wb")
-            self.current_wav_file.setnchannels(self.CHANNELS)
-            self.current_wav_file.setsampwidth(self.SAMPLE_WIDTH)
-            self.current_wav_file.setframerate(self.SAMPLE_RATE)
+            fd = os.open(str(filepath), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            # The format is fixed, so the header goes out once; placeholder
+            # sizes read as "until EOF" if the file is never finalized
+            os.write(fd, self.wav_header(0xFFFFFFFF))
+            self.current_wav_fd = fd
+            self._bytes_written = 0
 
             self.is_recording = True
             print(f"🔴 Started recording: {filename}")
 
         except Exception as e:
             print(f"❌ Failed to create WAV file: {e}")
-            self.current_wav_file = None
+            self.current_wav_fd = None
 
     def _stop_recording(self):
         """Stop recording and finalize WAV file."""
-        if self.current_wav_file:
-            self.current_wav_file.close()
-            self.current_wav_file = None
+        if self.current_wav_fd is not None:
+            self._flush_audio()
+            fd = self.current_wav_fd
+            os.pwrite(fd, struct.pack("<I", 36 + self._bytes_written), 4)
+            os.pwrite(fd, struct.pack("<I", self._bytes_written), 40)
+            os.close(fd)
+            self.current_wav_fd = None
 
             duration = self.total_samples / self.SAMPLE_RATE
             size_mb = (self.total_samples * self.SAMPLE_WIDTH) / (1024 * 1024)
@@ -210,6 +301,8 @@ class TCPAudioServer:
             print(f"✅ Recording saved ({duration:.1f}s, {size_mb:.2f} MB)")
             print(f"   Total samples: {self.total_samples:,}")
 
+        del self._write_buf[:]
+        self._bytes_received = 0
         self.is_recording = False
         self.total_samples = 0
 
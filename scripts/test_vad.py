@@ -2,28 +2,39 @@
 """
 Quick test script to verify Silero VAD installation and basic functionality.
 
+Checks that SileroVAD's ONNX backend returns the same per-window speech
+probabilities as the PyTorch Hub model on a bundled recording.
+
 Usage:
-  python test_vad.py
+  python test_vad.py [recording.wav]
 """
 
+import os
 import sys
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WAV = os.path.join(ROOT, 'recording_fixed.wav')
+
+# Largest per-window probability difference accepted between the backends
+MAX_PROB_DIFF = 0.01
 
 def test_imports():
     """Test that all required libraries are installed."""
     print("Testing imports...")
     
     try:
-        import torch
-        print(f"✓ PyTorch {torch.__version__}")
+        import onnxruntime
+        print(f"✓ onnxruntime {onnxruntime.__version__}")
     except ImportError:
-        print("✗ PyTorch not installed. Run: just setup-vad")
+        print("✗ onnxruntime not installed. Run: just setup-vad")
         return False
     
     try:
-        import torchaudio
-        print(f"✓ torchaudio {torchaudio.__version__}")
+        import torch
+        print(f"✓ PyTorch {torch.__version__}")
     except ImportError:
-        print("✗ torchaudio not installed. Run: just setup-vad")
+        print("✗ PyTorch not installed (needed for the hub reference). Run: just setup-vad")
         return False
     
     try:
@@ -36,76 +47,68 @@ def test_imports():
     return True
 
 
-def test_model_load():
-    """Test loading the Silero VAD model."""
-    print("\nTesting Silero VAD model loading...")
+def read_wav(path):
+    """Return the int16 samples of a 16 kHz mono 16-bit WAV file."""
+    import numpy as np
+
+    with wave.open(path, 'rb') as wf:
+        if (wf.getframerate(), wf.getnchannels(), wf.getsampwidth()) != (16000, 1, 2):
+            raise ValueError(f"{path} is not 16 kHz mono 16-bit")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def test_onnx_matches_hub(wav_path):
+    """Compare SileroVAD(backend='onnx') against the PyTorch Hub model."""
+    print(f"\nComparing ONNX backend with the hub model on {os.path.basename(wav_path)}...")
     
     try:
+        import numpy as np
         import torch
+        torch.set_num_threads(1)
+        
+        sys.path.insert(0, os.path.join(ROOT, 'pi-aggregator'))
+        from vad import SileroVAD
+        
+        vad = SileroVAD(sample_rate=16000, backend='onnx')
+        print("✓ SileroVAD ONNX backend loaded")
         
-        print("  Downloading/loading model from PyTorch Hub...")
-        model, utils = torch.hub.load(
+        print("  Downloading/loading reference model from PyTorch Hub...")
+        model, _ = torch.hub.load(
             repo_or_dir='snakers4/silero-vad',
             model='silero_vad',
             force_reload=False,
             onnx=False,
             trust_repo=True
         )
+        print("✓ Hub model loaded")
         
-        print("✓ Silero VAD model loaded successfully")
-        print(f"  Model device: {next(model.parameters()).device}")
-        
-        # Test basic inference with correct chunk size
-        print("\nTesting inference on dummy audio...")
-        import numpy as np
-        
-        # Create 512 samples of silence (required for 16kHz)
-        dummy_audio = np.zeros(512, dtype=np.float32)
-        audio_tensor = torch.from_numpy(dummy_audio)
-        
-        # Get VAD probability
+        audio = read_wav(wav_path)
+        window = vad.window_samples
+        onnx_probs = []
+        hub_probs = []
         with torch.no_grad():
-            speech_prob = model(audio_tensor, 16000).item()
+            for start in range(0, len(audio) - window + 1, window):
+                frame = audio[start:start + window]
+                onnx_probs.append(vad.process_chunk(frame)["confidence"])
+                ref = torch.from_numpy(frame.astype(np.float32) / 32768.0)
+                hub_probs.append(model(ref, 16000).item())
         
-        print(f"✓ Inference successful (silence probability: {speech_prob:.3f})")
+        onnx_probs = np.array(onnx_probs)
+        hub_probs = np.array(hub_probs)
+        diff = np.abs(onnx_probs - hub_probs)
+        agree = np.mean((onnx_probs >= vad.threshold) == (hub_probs >= vad.threshold))
+        print(f"  {len(diff)} windows, max |Δp| = {diff.max():.5f} (window {diff.argmax()})")
+        print(f"  Speech decisions agree on {agree * 100:.1f}% of windows")
         
-        if speech_prob < 0.1:
-            print("✓ Model correctly detected silence")
-        else:
-            print("⚠ Warning: Model detected speech in silence (may be OK)")
+        if diff.max() > MAX_PROB_DIFF:
+            print(f"✗ Probabilities differ by more than {MAX_PROB_DIFF}")
+            return False
         
+        print("✓ ONNX backend matches the hub model")
         return True
         
     except Exception as e:
-        print(f"✗ Failed to load model: {e}")
-        return False
-
-
-def test_vad_service():
-    """Test that the VAD service can be imported."""
-    print("\nTesting VAD service import...")
-    
-    try:
-        sys.path.insert(0, '/Users/arik/Documents/GitHub/JustNoise/pi-aggregator')
-        from vad import SileroVAD
-        
-        print("✓ VAD service imports successfully")
-        
-        # Try to instantiate
-        vad = SileroVAD(sample_rate=16000, device='cpu')
-        print("✓ SileroVAD instance created")
-        
-        # Test processing a chunk (512 samples for 16kHz)
-        import numpy as np
-        chunk = np.zeros(512, dtype=np.int16)  # 32ms at 16kHz (required size)
-        result = vad.process_chunk(chunk)
-        
-        print(f"✓ Chunk processing works (result: {result})")
-        
-        return True
-        
-    except Exception as e:
-        print(f"✗ Failed to test VAD service: {e}")
+        print(f"✗ Comparison failed: {e}")
         import traceback
         traceback.print_exc()
         return False
@@ -124,12 +127,9 @@ def main():
         print("\n⚠ Install dependencies with: just setup-vad")
         return
     
-    # Test 2: Model loading
-    if not test_model_load():
-        all_passed = False
-    
-    # Test 3: VAD service
-    if not test_vad_service():
+    # Test 2: ONNX backend vs hub reference
+    wav_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_WAV
+    if not test_onnx_matches_hub(wav_path):
         all_passed = False
     
     # Summary
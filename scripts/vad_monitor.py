@@ -15,13 +15,14 @@ Usage:
 import sys
 import os
 import time
+import queue
 import argparse
+import threading
 from datetime import datetime
 import struct
 
 try:
     import numpy as np
-    import torch
 except ImportError:
     print("ERROR: Dependencies not installed. Run: just setup-vad")
     sys.exit(1)
@@ -34,26 +35,55 @@ except ImportError:
     print("ERROR: Could not import VAD module")
     sys.exit(1)
 
+# WAV header fields are little-endian uint32
+_U32LE = struct.Struct('<I').unpack_from
+
 
 class VADMonitor:
     """CLI monitor for real-time voice activity detection."""
     
-    def __init__(self, serial_port, baudrate=921600, continuous=False):
+    # Serial reads block for READ_SIZE bytes (~45ms at 921600 baud) but
+    # take whatever has queued up, to READ_MAX, when the reader falls behind
+    READ_SIZE = 4096
+    READ_MAX = 32768
+    # Terminal redraws per second are capped at 1 / DRAW_INTERVAL_S
+    DRAW_INTERVAL_S = 0.1
+    STATUS_SPEECH = "🔴 SPEECH"
+    STATUS_SILENCE = "⚪ SILENCE"
+    # Holds the reader's queue depth of READ_MAX reads plus a partial frame,
+    # and is a whole number of 1024-byte frames
+    RING_SIZE = 1 << 19
+    
+    def __init__(self, serial_port, baudrate=921600, continuous=False, vad_backend=None):
         self.serial_port = serial_port
         self.baudrate = baudrate
         self.continuous = continuous
-        self.vad = SileroVAD(sample_rate=16000, device='cpu')
+        # A single intra-op thread avoids the pool's fork/join on every frame
+        self.vad = SileroVAD(sample_rate=16000, device='cpu', backend=vad_backend,
+                             num_threads=1)
+        
+        # Serial stream ring; the reader fills it and VAD reads frames in place
+        self._ring = bytearray(self.RING_SIZE)
+        self._ring_view = memoryview(self._ring)
         
         # Stats
         self.total_chunks = 0
         self.speech_chunks = 0
         self.current_speech_start = None
-        self.speech_segments = []
+        # Speech segment count, total and longest duration (s)
+        self._n_segs = 0
+        self._seg_sum = 0.0
+        self._seg_max = 0.0
         self.recording_count = 0
         
         # Display
         self.last_state = False
         self.bar_width = 50
+        # Every possible bar, indexed by filled width
+        self._bars = [
+            "█" * i + "░" * (self.bar_width - i) for i in range(self.bar_width + 1)
+        ]
+        self._last_draw = 0.0
         
     def print_header(self):
         """Print monitor header."""
@@ -79,7 +109,7 @@ class VADMonitor:
             print(f"[{timestamp}] 🔴 VOCALS DETECTED - SPEECH STARTED!")
             print(f"{'🗣️  ' * 10}\n")
         elif alert_type == "speech_end":
-            duration = (datetime.now() - self.current_speech_start).total_seconds()
+            duration = time.monotonic() - self.current_speech_start
             print(f"\n[{timestamp}] 🟢 Speech ended (duration: {duration:.2f}s)")
         elif alert_type == "info":
             print(f"[{timestamp}] ℹ️  {message}")
@@ -87,18 +117,20 @@ class VADMonitor:
             print(f"[{timestamp}] {message}")
     
     def print_progress_bar(self, confidence, is_speech):
-        """Print visual confidence bar."""
-        filled = int(confidence * self.bar_width)
-        bar = "█" * filled + "░" * (self.bar_width - filled)
+        """Print visual confidence bar, redrawn at most DRAW_INTERVAL_S apart."""
+        now = time.monotonic()
+        if now - self._last_draw < self.DRAW_INTERVAL_S:
+            return
+        self._last_draw = now
+        
+        bar = self._bars[int(confidence * self.bar_width)]
         
         # Color coding
-        if is_speech:
-            status = "🔴 SPEECH"
-        else:
-            status = "⚪ SILENCE"
+        status = self.STATUS_SPEECH if is_speech else self.STATUS_SILENCE
         
         # Print bar
-        print(f"\r{status} [{bar}] {confidence:.2%} ", end="", flush=True)
+        sys.stdout.write("\r" + status + " [" + bar + "] " + format(confidence, ".2%") + " ")
+        sys.stdout.flush()
     
     def process_audio_stream(self):
         """Process ESP32 audio stream and monitor for speech."""
@@ -106,6 +138,9 @@ class VADMonitor:
         
         # Open serial connection
         ser = serial.Serial(self.serial_port, baudrate=self.baudrate, timeout=5)
+        if hasattr(ser, 'set_buffer_size'):
+            # Windows only; the default driver queue holds ~40ms at this rate
+            ser.set_buffer_size(rx_size=1 << 20)
         self.print_alert(f"Connected to {self.serial_port} at {self.baudrate} baud")
         
         try:
@@ -168,21 +203,32 @@ class VADMonitor:
         buffer = b''
         timeout_counter = 0
         
-        while timeout_counter < 200:
-            available = ser.in_waiting
-            if available > 0:
-                data = ser.read(min(available, 512))
-                buffer += data
-                riff_index = buffer.find(b'RIFF')
-                if riff_index >= 0:
-                    buffer = buffer[riff_index:]
-                    break
-            else:
-                timeout_counter += 1
-                time.sleep(0.1)
-                # Show progress every 5 seconds (only in single mode)
-                if not self.continuous and timeout_counter % 50 == 0:
-                    print(f"  ... still waiting ({timeout_counter * 0.1:.0f}s elapsed)")
+        # Wait in the driver for data rather than polling in_waiting; the
+        # short timeout is only for the search, stream reads keep the port's
+        data_timeout = ser.timeout
+        ser.timeout = 0.1
+        try:
+            while timeout_counter < 200:
+                data = ser.read(max(1, min(ser.in_waiting, self.READ_SIZE)))
+                if data:
+                    buffer += data
+                    riff_index = buffer.find(b'RIFF')
+                    if riff_index >= 0:
+                        buffer = buffer[riff_index:]
+                        break
+                    # Keep only a possible partial 'RIFF' across reads
+                    buffer = buffer[-3:]
+                else:
+                    timeout_counter += 1
+                    # Show progress every 5 seconds (only in single mode)
+                    if not self.continuous and timeout_counter % 50 == 0:
+                        print(f"  ... still waiting ({timeout_counter * 0.1:.0f}s elapsed)")
+        finally:
+            ser.timeout = data_timeout
+        
+        # Top up a header split across reads
+        if buffer.startswith(b'RIFF') and len(buffer) < 44:
+            buffer += ser.read(44 - len(buffer))
         
         if len(buffer) < 44:
             if not self.continuous:
@@ -203,8 +249,7 @@ class VADMonitor:
             return
         
         # Parse header
-        header = buffer[:44]
-        data_size = struct.unpack('<I', header[40:44])[0]
+        data_size = _U32LE(buffer, 40)[0]
         
         if not self.continuous or self.recording_count == 1:
             self.print_alert(f"Audio stream found! ({data_size} bytes, {data_size/32000:.1f}s)")
@@ -214,58 +259,119 @@ class VADMonitor:
                 print("=" * 70 + "\n")
         
         # Process audio chunks
-        remaining_buffer = buffer[44:]
-        bytes_read = len(remaining_buffer)
+        leftover = buffer[44:]
         frame_samples = 512  # Required by Silero VAD
+        self._ring[:len(leftover)] = leftover
         
-        while bytes_read < data_size:
-            # Read more data
-            chunk_size = min(4096, data_size - bytes_read)
-            chunk = ser.read(chunk_size)
-            if not chunk:
+        # Serial reads run on their own thread so the port keeps draining
+        # while a frame is in the model; the bounded queue applies backpressure
+        chunks = queue.Queue(maxsize=8)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read_stream,
+            args=(ser, len(leftover), data_size - len(leftover), chunks, stop),
+            daemon=True,
+        )
+        reader.start()
+        
+        try:
+            self._process_chunks(chunks, len(leftover), frame_samples)
+        finally:
+            stop.set()
+            reader.join()
+    
+    def _read_stream(self, ser, head, remaining, chunks, stop):
+        """
+        Read up to `remaining` bytes into the ring starting at `head`.
+        
+        Each read's byte count goes on `chunks`, then a None sentinel. The
+        queue bound keeps the reader less than a ring's length ahead of
+        the consumer, so unprocessed bytes are never overwritten.
+        """
+        end = None
+        try:
+            while remaining > 0 and not stop.is_set():
+                # Reads stop at the end of the ring, never wrapping mid-read
+                size = min(
+                    max(self.READ_SIZE, min(ser.in_waiting, self.READ_MAX)),
+                    remaining,
+                    self.RING_SIZE - head,
+                )
+                n = ser.readinto(self._ring_view[head:head + size])
+                if not n:
+                    break
+                head = (head + n) % self.RING_SIZE
+                remaining -= n
+                while not stop.is_set():
+                    try:
+                        chunks.put(n, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        except Exception as e:
+            # Handed to the consumer so serial errors still surface there
+            end = e
+        finally:
+            # Once stopped the consumer is gone and nothing reads the sentinel
+            if not stop.is_set():
+                chunks.put(end)
+    
+    def _process_chunks(self, chunks, available, frame_samples):
+        """Run VAD over ring frames until the reader's sentinel arrives."""
+        frame_bytes = frame_samples * 2
+        tail = 0
+        
+        while True:
+            n = chunks.get()
+            if isinstance(n, Exception):
+                raise n
+            if n is not None:
+                available += n
+            
+            # Every complete frame goes to the model as soon as it is read.
+            # The ring length is a multiple of the frame size, so a frame
+            # never straddles the wrap point
+            while available >= frame_bytes:
+                frame = np.frombuffer(
+                    self._ring, dtype='<i2', count=frame_samples, offset=tail
+                )
+                self._handle_result(*self.vad.detect(frame))
+                tail = (tail + frame_bytes) % self.RING_SIZE
+                available -= frame_bytes
+            
+            if n is None:
                 break
+    
+    def _handle_result(self, is_speech, confidence):
+        """Update stats and display for one frame's VAD result."""
+        self.total_chunks += 1
+        
+        # Detect state changes
+        if is_speech and not self.last_state:
+            # Speech started!
+            self.current_speech_start = time.monotonic()
+            self.print_alert("", "speech_start")
+            self.last_state = True
+            self.speech_chunks += 1
             
-            remaining_buffer += chunk
-            bytes_read += len(chunk)
+        elif not is_speech and self.last_state:
+            # Speech ended
+            self.print_alert("", "speech_end")
+            segment_duration = time.monotonic() - self.current_speech_start
+            self._n_segs += 1
+            self._seg_sum += segment_duration
+            self._seg_max = max(self._seg_max, segment_duration)
+            self.current_speech_start = None
+            self.last_state = False
+            print()  # New line after progress bar
             
-            # Process complete frames
-            while len(remaining_buffer) >= frame_samples * 2:
-                sample_bytes = frame_samples * 2
-                samples = np.frombuffer(remaining_buffer[:sample_bytes], dtype=np.int16)
-                remaining_buffer = remaining_buffer[sample_bytes:]
-                
-                # Run VAD
-                result = self.vad.process_chunk(samples)
-                self.total_chunks += 1
-                
-                # Get confidence (use a simple speech probability estimate)
-                confidence = result.get('confidence', 0.0)
-                is_speech = result['speech']
-                
-                # Detect state changes
-                if is_speech and not self.last_state:
-                    # Speech started!
-                    self.current_speech_start = datetime.now()
-                    self.print_alert("", "speech_start")
-                    self.last_state = True
-                    self.speech_chunks += 1
-                    
-                elif not is_speech and self.last_state:
-                    # Speech ended
-                    self.print_alert("", "speech_end")
-                    segment_duration = (datetime.now() - self.current_speech_start).total_seconds()
-                    self.speech_segments.append(segment_duration)
-                    self.current_speech_start = None
-                    self.last_state = False
-                    print()  # New line after progress bar
-                    
-                elif is_speech:
-                    # Continuing speech
-                    self.speech_chunks += 1
-                
-                # Update progress bar (only when speech detected)
-                if is_speech:
-                    self.print_progress_bar(confidence, is_speech)
+        elif is_speech:
+            # Continuing speech
+            self.speech_chunks += 1
+        
+        # Update progress bar (only when speech detected)
+        if is_speech:
+            self.print_progress_bar(confidence, is_speech)
     
     def print_summary(self):
         """Print session summary."""
@@ -277,12 +383,12 @@ class VADMonitor:
         print(f"Total chunks processed: {self.total_chunks}")
         print(f"Speech chunks:          {self.speech_chunks}")
         print(f"Speech percentage:      {(self.speech_chunks/self.total_chunks*100) if self.total_chunks > 0 else 0:.1f}%")
-        print(f"Speech segments:        {len(self.speech_segments)}")
+        print(f"Speech segments:        {self._n_segs}")
         
-        if self.speech_segments:
-            print(f"Total speech time:      {sum(self.speech_segments):.2f}s")
-            print(f"Average segment:        {sum(self.speech_segments)/len(self.speech_segments):.2f}s")
-            print(f"Longest segment:        {max(self.speech_segments):.2f}s")
+        if self._n_segs:
+            print(f"Total speech time:      {self._seg_sum:.2f}s")
+            print(f"Average segment:        {self._seg_sum/self._n_segs:.2f}s")
+            print(f"Longest segment:        {self._seg_max:.2f}s")
         
         print("=" * 70)
 
@@ -295,11 +401,14 @@ def main():
                         help='Baud rate (default: 921600)')
     parser.add_argument('--continuous', '-c', action='store_true',
                         help='Continuous monitoring mode (loops indefinitely)')
+    parser.add_argument('--vad-backend', choices=['onnx', 'torch'], default=None,
+                        help='Silero VAD backend (default: ONNX if onnxruntime is installed)')
     
     args = parser.parse_args()
     
     # Create monitor
-    monitor = VADMonitor(args.port, args.baudrate, continuous=args.continuous)
+    monitor = VADMonitor(args.port, args.baudrate, continuous=args.continuous,
+                         vad_backend=args.vad_backend)
     monitor.print_header()
     
     try:
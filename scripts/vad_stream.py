@@ -17,15 +17,17 @@ Usage:
 
 import argparse
 import os
-import struct
+import queue
+import selectors
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
     import numpy as np
-    import torch
 except ImportError:
     print("ERROR: Dependencies not installed. Run: just setup-vad")
     sys.exit(1)
@@ -42,6 +44,14 @@ except ImportError:
 class PCMVADMonitor:
     """Real-time VAD monitor for raw PCM stream."""
 
+    FRAME_BYTES = 1024  # 512 int16 samples, 32ms at 16kHz
+    RING_FRAMES = 64  # ~2s of audio between the serial reader and VAD
+    READ_FRAMES = 16  # Most frames taken in one serial read when behind
+    # Terminal redraws per second are capped at 1 / DRAW_INTERVAL_S
+    DRAW_INTERVAL_S = 0.05
+    STATUS_SPEECH = "🔴 SPEECH"
+    STATUS_SILENCE = "⚪ SILENCE"
+
     def __init__(
         self,
         serial_port,
@@ -51,30 +61,58 @@ class PCMVADMonitor:
         enable_volume_control=False,
         speech_volume=60,
         silence_volume=100,
+        vad_backend=None,
+        gate_margin_db=None,
     ):
         self.serial_port = serial_port
         self.baudrate = baudrate
         self.min_silence_ms = min_silence_ms
         self.min_speech_ms = min_speech_ms
+        # ONNX by default; one intra-op thread suits a single 512-sample window
         self.vad = SileroVAD(
-            sample_rate=16000, device="cpu", min_silence_duration_ms=min_silence_ms
+            sample_rate=16000,
+            device="cpu",
+            min_silence_duration_ms=min_silence_ms,
+            backend=vad_backend,
+            num_threads=1,
+            gate_margin_db=gate_margin_db,
         )
 
         # Volume control settings
         self.enable_volume_control = enable_volume_control
         self.speech_volume = speech_volume
         self.silence_volume = silence_volume
+        # osascript takes tens of ms, so it runs off the VAD loop
+        self._vol_exec = (
+            ThreadPoolExecutor(max_workers=1) if enable_volume_control else None
+        )
+        self._vol_pending = None
 
         # Stats
         self.total_chunks = 0
         self.speech_chunks = 0
         self.current_speech_start = None
-        self.speech_segments = []
+        # Speech segment count, total and longest duration (s)
+        self._n_segs = 0
+        self._seg_sum = 0.0
+        self._seg_max = 0.0
         self.session_start = None
 
         # Display
         self.last_state = False
         self.bar_width = 50
+        self._last_draw = 0.0
+        # Every possible bar, indexed by filled width
+        self._bars = [
+            "█" * i + "░" * (self.bar_width - i) for i in range(self.bar_width + 1)
+        ]
+
+        # Ring of PCM frames; serial reads land in it and VAD reads it in place
+        self._ring_buf = bytearray(self.FRAME_BYTES * self.RING_FRAMES)
+        self._ring_view = memoryview(self._ring_buf)
+        self._ring = np.frombuffer(self._ring_buf, dtype=np.int16).reshape(
+            self.RING_FRAMES, -1
+        )
 
     def print_header(self):
         """Print monitor header."""
@@ -102,10 +140,17 @@ class PCMVADMonitor:
         print("\n⏳ Waiting for ESP32 raw PCM stream...\n")
 
     def set_volume(self, volume):
-        """Set macOS system volume using osascript."""
+        """Set macOS system volume in the background."""
         if not self.enable_volume_control:
             return
 
+        # Only the latest change matters; drop one that hasn't started yet
+        if self._vol_pending is not None:
+            self._vol_pending.cancel()
+        self._vol_pending = self._vol_exec.submit(self._apply_volume, volume)
+
+    def _apply_volume(self, volume):
+        """Set macOS system volume using osascript."""
         try:
             applescript = f"set volume output volume {volume}"
             subprocess.run(
@@ -128,7 +173,7 @@ class PCMVADMonitor:
                 print(f"[{timestamp}] 🔊 Volume set to {self.speech_volume}%")
             print(f"{'🗣️  ' * 10}\n")
         elif alert_type == "speech_end":
-            duration = (datetime.now() - self.current_speech_start).total_seconds()
+            duration = time.monotonic() - self.current_speech_start
             print(f"\n[{timestamp}] 🟢 Speech ended (duration: {duration:.2f}s)")
             if self.enable_volume_control:
                 print(f"[{timestamp}] 🔊 Volume set to {self.silence_volume}%")
@@ -138,18 +183,20 @@ class PCMVADMonitor:
             print(f"[{timestamp}] {message}")
 
     def print_progress_bar(self, confidence, is_speech):
-        """Print visual confidence bar."""
-        filled = int(confidence * self.bar_width)
-        bar = "█" * filled + "░" * (self.bar_width - filled)
+        """Print visual confidence bar, redrawn at most DRAW_INTERVAL_S apart."""
+        now = time.monotonic()
+        if now - self._last_draw < self.DRAW_INTERVAL_S:
+            return
+        self._last_draw = now
+
+        bar = self._bars[int(confidence * self.bar_width)]
 
         # Color coding
-        if is_speech:
-            status = "🔴 SPEECH"
-        else:
-            status = "⚪ SILENCE"
+        status = self.STATUS_SPEECH if is_speech else self.STATUS_SILENCE
 
         # Print bar
-        print(f"\r{status} [{bar}] {confidence:.2%} ", end="", flush=True)
+        sys.stdout.write("\r" + status + " [" + bar + "] " + format(confidence, ".2%") + " ")
+        sys.stdout.flush()
 
     def process_pcm_stream(self):
         """Process raw PCM stream from ESP32 and monitor for speech."""
@@ -157,6 +204,9 @@ class PCMVADMonitor:
 
         # Open serial connection
         ser = serial.Serial(self.serial_port, baudrate=self.baudrate, timeout=5)
+        if hasattr(ser, "set_buffer_size"):
+            # Windows only; the default driver queue holds ~40ms at this rate
+            ser.set_buffer_size(rx_size=1 << 20)
         self.print_alert(f"Connected to {self.serial_port} at {self.baudrate} baud")
 
         try:
@@ -165,6 +215,8 @@ class PCMVADMonitor:
             print("\n\n⚠️  Monitoring stopped by user")
         finally:
             ser.close()
+            if self._vol_exec is not None:
+                self._vol_exec.shutdown(wait=True)
             self.print_summary()
 
     def _stream_pcm(self, ser):
@@ -176,49 +228,43 @@ class PCMVADMonitor:
         self.print_alert("Trigger sent to ESP32...")
         time.sleep(0.1)
 
-        self.session_start = datetime.now()
+        self.session_start = time.monotonic()
         print("\n" + "=" * 70)
         print("🎧 MONITORING STARTED - Listening for vocals...")
         print("=" * 70 + "\n")
 
-        # Buffer for collecting PCM samples
-        pcm_buffer = b""
-        frame_samples = 512  # Required by Silero VAD (32ms at 16kHz)
-        frame_bytes = frame_samples * 2  # 16-bit = 2 bytes per sample
         frame_duration_ms = 32  # 512 samples at 16kHz = 32ms
 
         # Hysteresis tracking (grace period for brief silences)
         potential_speech_start = None
         silence_counter = 0
+        # How many silent frames before ending, rounded up so the per-frame
+        # check is a plain int comparison
         silence_threshold = (
-            self.min_silence_ms / frame_duration_ms
-        )  # How many silent frames before ending
+            self.min_silence_ms + frame_duration_ms - 1
+        ) // frame_duration_ms
+
+        # Serial reads run on their own thread, blocking in the driver
+        # instead of polling in_waiting; each complete frame is handed over
+        # by index. The queue bound keeps the reader, and the frames a
+        # single read can span, off frames still queued or in the model
+        frames = queue.Queue(maxsize=self.RING_FRAMES - (self.READ_FRAMES + 1) - 1)
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=self._read_frames, args=(ser, frames, stop), daemon=True
+        )
+        reader.start()
 
         # Process streaming data
-        while True:
-            try:
-                # Read available data from serial
-                available = ser.in_waiting
-                if available > 0:
-                    data = ser.read(min(available, 4096))
-                    pcm_buffer += data
-
-                # Process complete frames
-                while len(pcm_buffer) >= frame_bytes:
-                    # Extract one frame
-                    frame_data = pcm_buffer[:frame_bytes]
-                    pcm_buffer = pcm_buffer[frame_bytes:]
-
-                    # Convert to numpy array
-                    samples = np.frombuffer(frame_data, dtype=np.int16)
-
-                    # Run VAD
-                    result = self.vad.process_chunk(samples)
-                    self.total_chunks += 1
+        try:
+            while True:
+                index = frames.get()
+                if isinstance(index, Exception):
+                    raise index
 
-                    # Get confidence
-                    confidence = result.get("confidence", 0.0)
-                    is_speech = result["speech"]
+                try:
+                    is_speech, confidence = self.vad.detect(self._ring[index])
+                    self.total_chunks += 1
 
                     # Hysteresis logic with grace period
                     if is_speech:
@@ -228,7 +274,7 @@ class PCMVADMonitor:
                         # Detect speech start
                         if not self.last_state:
                             # Speech started!
-                            self.current_speech_start = datetime.now()
+                            self.current_speech_start = time.monotonic()
                             self.set_volume(self.speech_volume)
                             self.print_alert("", "speech_start")
                             self.last_state = True
@@ -252,29 +298,81 @@ class PCMVADMonitor:
                                 self.set_volume(self.silence_volume)
                                 self.print_alert("", "speech_end")
                                 segment_duration = (
-                                    datetime.now() - self.current_speech_start
-                                ).total_seconds()
-                                self.speech_segments.append(segment_duration)
+                                    time.monotonic() - self.current_speech_start
+                                )
+                                self._n_segs += 1
+                                self._seg_sum += segment_duration
+                                self._seg_max = max(self._seg_max, segment_duration)
                                 self.current_speech_start = None
                                 self.last_state = False
                                 silence_counter = 0
                                 print()  # New line after progress bar
 
-                # Small sleep to prevent busy-waiting when buffer is empty
-                if available == 0:
-                    time.sleep(0.001)
+                except Exception as e:
+                    print(f"\n⚠️  Error processing stream: {e}")
+                    time.sleep(1)
+        finally:
+            stop.set()
+            reader.join()
+
+    def _read_frames(self, ser, frames, stop):
+        """Fill the ring from the serial port and queue each complete frame."""
+        # Short timeout so a stop request is noticed promptly
+        ser.timeout = 0.1
+        frame_bytes = self.FRAME_BYTES
+        ring_bytes = len(self._ring_buf)
+        read_max = self.FRAME_BYTES * self.READ_FRAMES
+        pos = 0
+
+        # On POSIX the kernel copies straight into the ring with readv on
+        # the port fd, rather than pyserial reading into bytes that
+        # readinto then copies again
+        fd = getattr(ser, "fd", None)
+        sel = None
+        if fd is not None and hasattr(os, "readv"):
+            sel = selectors.DefaultSelector()
+            sel.register(fd, selectors.EVENT_READ)
 
-            except Exception as e:
-                print(f"\n⚠️  Error processing stream: {e}")
-                # Try to reconnect
-                time.sleep(1)
+        try:
+            while not stop.is_set():
+                if sel is not None:
+                    if not sel.select(0.1):
+                        continue
+                    end = min(pos + read_max, ring_bytes)
+                    n = os.readv(fd, [self._ring_view[pos:end]])
+                    if not n:
+                        raise OSError("Serial device returned no data (disconnected?)")
+                else:
+                    # Block only until the current frame completes, but take
+                    # whatever has queued up (to READ_FRAMES) in the same read
+                    end = max(
+                        (pos // frame_bytes + 1) * frame_bytes,
+                        pos + min(ser.in_waiting, read_max),
+                    )
+                    end = min(end, ring_bytes)
+                    n = ser.readinto(self._ring_view[pos:end])
+                for index in range(pos // frame_bytes, (pos + n) // frame_bytes):
+                    while not stop.is_set():
+                        try:
+                            frames.put(index, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                pos = (pos + n) % ring_bytes
+        except Exception as e:
+            # Serial errors end the stream and are raised on the VAD side
+            if not stop.is_set():
+                frames.put(e)
+        finally:
+            if sel is not None:
+                sel.close()
 
     def print_summary(self):
         """Print session summary."""
         if self.session_start is None:
             return
 
-        session_duration = (datetime.now() - self.session_start).total_seconds()
+        session_duration = time.monotonic() - self.session_start
 
         print("\n\n" + "=" * 70)
         print("📊 SESSION SUMMARY")
@@ -285,14 +383,12 @@ class PCMVADMonitor:
         print(
             f"Speech percentage:      {(self.speech_chunks / self.total_chunks * 100) if self.total_chunks > 0 else 0:.1f}%"
         )
-        print(f"Speech segments:        {len(self.speech_segments)}")
+        print(f"Speech segments:        {self._n_segs}")
 
-        if self.speech_segments:
-            print(f"Total speech time:      {sum(self.speech_segments):.2f}s")
-            print(
-                f"Average segment:        {sum(self.speech_segments) / len(self.speech_segments):.2f}s"
-            )
-            print(f"Longest segment:        {max(self.speech_segments):.2f}s")
+        if self._n_segs:
+            print(f"Total speech time:      {self._seg_sum:.2f}s")
+            print(f"Average segment:        {self._seg_sum / self._n_segs:.2f}s")
+            print(f"Longest segment:        {self._seg_max:.2f}s")
 
         print("=" * 70)
 
@@ -337,6 +433,18 @@ def main():
         default=100,
         help="Volume level when silent (default: 100%%)",
     )
+    parser.add_argument(
+        "--vad-backend",
+        choices=["onnx", "torch"],
+        default=None,
+        help="Silero VAD backend (default: ONNX if onnxruntime is installed)",
+    )
+    parser.add_argument(
+        "--gate-margin-db",
+        type=float,
+        default=None,
+        help="Skip VAD inference on frames within this many dB of the tracked noise floor (e.g. 6)",
+    )
 
     args = parser.parse_args()
 
@@ -349,6 +457,8 @@ def main():
         enable_volume_control=args.volume_control,
         speech_volume=args.speech_volume,
         silence_volume=args.silence_volume,
+        vad_backend=args.vad_backend,
+        gate_margin_db=args.gate_margin_db,
     )
     monitor.print_header()
 
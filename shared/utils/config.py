@@ -1,27 +1,68 @@
 import os
+from dataclasses import dataclass
+
 from dotenv import load_dotenv
 
 # Load .env from project root (assuming script is run from project root or subfolder)
 # We'll try to find .env by walking up directories
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
-load_dotenv(os.path.join(project_root, '.env'))
+# Child processes inherit the loaded values, so they skip parsing it again
+if os.environ.get('CONFIG_LOADED') != '1':
+    load_dotenv(os.path.join(project_root, '.env'))
+    os.environ['CONFIG_LOADED'] = '1'
+
+@dataclass(frozen=True, slots=True)
+class _Config:
+    MQTT_BROKER: str
+    MQTT_PORT: int
+    ROOM_ID: str
 
-class Config:
-    MQTT_BROKER = os.getenv('MQTT_BROKER', 'localhost')
-    MQTT_PORT = int(os.getenv('MQTT_PORT', 1883))
-    ROOM_ID = os.getenv('ROOM_ID', 'room1')
-    
     # Topics
-    TOPIC_PREFIX = f"classroom/{ROOM_ID}"
-    TOPIC_AUDIO_FEATURES = f"{TOPIC_PREFIX}/esp32/+/audio/features"
-    TOPIC_PIR = f"{TOPIC_PREFIX}/esp32/+/pir"
-    TOPIC_ENV = f"{TOPIC_PREFIX}/esp32/+/env"
-    TOPIC_NOISE_PROFILE = f"{TOPIC_PREFIX}/pi/aggregator/noise_profile"
-    TOPIC_VAD = f"{TOPIC_PREFIX}/pi/aggregator/vad"
-    TOPIC_VAD_EVENT = f"{TOPIC_PREFIX}/pi/aggregator/vad_event"
-    TOPIC_ACTUATION_SPEAKER = f"{TOPIC_PREFIX}/pi/decision/actuation/speaker"
-    TOPIC_ACTUATION_DISPLAY = f"{TOPIC_PREFIX}/pi/decision/actuation/display"
+    TOPIC_PREFIX: str
+    TOPIC_AUDIO_FEATURES: str
+    TOPIC_PIR: str
+    TOPIC_ENV: str
+    TOPIC_NOISE_PROFILE: str
+    TOPIC_VAD: str
+    TOPIC_VAD_EVENT: str
+    TOPIC_ACTUATION_SPEAKER: str
+    TOPIC_ACTUATION_DISPLAY: str
 
     # Aggregator settings
-    AGGREGATION_WINDOW_SEC = int(os.getenv('AGGREGATION_WINDOW_SEC', 60))
+    AGGREGATION_WINDOW_SEC: int
+    # Noise profile publishes are coalesced and flushed on this interval
+    PROFILE_FLUSH_MS: int
+
+    # VAD settings
+    VAD_ONNX_MODEL: str
+
+
+def _load_config():
+    """Read the environment once into a frozen Config."""
+    room_id = os.getenv('ROOM_ID', 'room1')
+    prefix = f"classroom/{room_id}"
+    return _Config(
+        MQTT_BROKER=os.getenv('MQTT_BROKER', 'localhost'),
+        MQTT_PORT=int(os.getenv('MQTT_PORT', 1883)),
+        ROOM_ID=room_id,
+        TOPIC_PREFIX=prefix,
+        TOPIC_AUDIO_FEATURES=f"{prefix}/esp32/+/audio/features",
+        TOPIC_PIR=f"{prefix}/esp32/+/pir",
+        TOPIC_ENV=f"{prefix}/esp32/+/env",
+        TOPIC_NOISE_PROFILE=f"{prefix}/pi/aggregator/noise_profile",
+        TOPIC_VAD=f"{prefix}/pi/aggregator/vad",
+        TOPIC_VAD_EVENT=f"{prefix}/pi/aggregator/vad_event",
+        TOPIC_ACTUATION_SPEAKER=f"{prefix}/pi/decision/actuation/speaker",
+        TOPIC_ACTUATION_DISPLAY=f"{prefix}/pi/decision/actuation/display",
+        AGGREGATION_WINDOW_SEC=int(os.getenv('AGGREGATION_WINDOW_SEC', 60)),
+        PROFILE_FLUSH_MS=int(os.getenv('PROFILE_FLUSH_MS', 200)),
+        VAD_ONNX_MODEL=os.getenv(
+            'VAD_ONNX_MODEL',
+            os.path.join(project_root, 'pi-aggregator', 'models', 'silero_vad.onnx'),
+        ),
+    )
+
+
+# Settings are read once at import; attributes are slot reads on a frozen instance
+Config = _load_config()
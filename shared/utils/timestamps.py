@@ -0,0 +1,35 @@
+import time
+
+# (epoch second, "YYYY-MM-DDTHH:MM:SS"); replaced as a whole so readers on
+# other threads never see a mismatched pair
+_cache = (None, "")
+
+
+def _second_prefix(sec):
+    global _cache
+    cached_sec, prefix = _cache
+    if cached_sec != sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _cache = (sec, prefix)
+    return prefix
+
+
+def utc_timestamp():
+    """Current UTC time as ISO 8601 with a trailing Z, at one-second resolution.
+
+    Outbound payloads only need second granularity, so the string is built
+    once per second and reused for every message in between.
+    """
+    return _second_prefix(int(time.time())) + "Z"
+
+
+def utc_timestamp_ms(ts_ns=None):
+    """UTC ISO 8601 timestamp with milliseconds, e.g. 2024-01-01T12:00:00.123Z.
+
+    Only the millisecond suffix is formatted per call; the date/time prefix
+    comes from the same per-second cache as `utc_timestamp`.
+    """
+    if ts_ns is None:
+        ts_ns = time.time_ns()
+    sec, rem = divmod(ts_ns, 1_000_000_000)
+    return "%s.%03dZ" % (_second_prefix(sec), rem // 1_000_000)
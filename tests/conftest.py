@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The services are standalone scripts, not a package; import them by module name
+for subdir in ("pi-aggregator", "pi-decision", "shared"):
+    sys.path.insert(0, os.path.join(ROOT, subdir))
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import decision
+import train
+
+
+@pytest.fixture
+def forest(tmp_path, monkeypatch):
+    """A small fitted forest, exported to model.npz in a scratch directory."""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(-80, 20, (400, 1))
+    y = np.clip((X[:, 0] + 60) / 60, 0, 1) + rng.normal(0, 0.05, 400)
+    model = RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+    monkeypatch.chdir(tmp_path)
+    train.export_arrays(model, decision.MODEL_ARRAYS_PATH)
+    return model
+
+
+def load_arrays():
+    with np.load(decision.MODEL_ARRAYS_PATH) as f:
+        return tuple(f[k] for k in ("feature", "threshold", "left", "right", "value", "roots"))
+
+
+def test_walk_matches_sklearn(forest):
+    X = np.random.default_rng(1).uniform(-100, 40, (500, 1))
+    X = X.astype(np.float32).astype(np.float64)
+    np.testing.assert_allclose(decision._walk(*load_arrays(), X), forest.predict(X))
+
+
+def test_walk_multi_feature(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(300, 3))
+    model = RandomForestRegressor(n_estimators=4, max_depth=5, random_state=0)
+    model.fit(X, X @ [1.0, -2.0, 0.5])
+    monkeypatch.chdir(tmp_path)
+    train.export_arrays(model, decision.MODEL_ARRAYS_PATH)
+    X = X.astype(np.float32).astype(np.float64)
+    np.testing.assert_allclose(decision._walk(*load_arrays(), X), model.predict(X))
+
+
+def test_agent_uses_forest_lut(forest):
+    agent = decision.DecisionAgent()
+    assert agent._forest is not None and agent._lut is not None
+
+    for mean in (-72.3, -40.0, -12.7, 5.1):
+        cmd = agent.decide({"mean_rms_db": mean})
+        score = forest.predict(np.float32([[mean]]).astype(np.float64))[0]
+        assert cmd["source"] == "random_forest"
+        assert cmd["level"] == pytest.approx(round(1.0 - score, 2), abs=0.011)
+
+
+def test_lut_rounds_to_nearest_step_and_clamps(forest):
+    agent = decision.DecisionAgent()
+    lut = agent._lut
+    assert agent._lookup(-50.04) == float(lut[300])
+    assert agent._lookup(-49.96) == float(lut[300])
+    assert agent._lookup(-500.0) == float(lut[0])
+    assert agent._lookup(500.0) == float(lut[-1])
+
+
+def test_heuristic_without_model(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = decision.DecisionAgent()
+    assert not agent.has_model
+    assert agent.decide({"mean_rms_db": -30.0})["level"] == 0.5
+    assert agent.decide({"mean_rms_db": -90.0})["level"] == 1.0
+    assert agent.decide({"mean_rms_db": 10.0})["level"] == 0.0
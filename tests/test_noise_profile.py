@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import aggregator
+from aggregator import NoiseProfile
+
+T0 = 1_765_886_400  # 2025-12-16T12:00:00Z
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable wall clock (seconds) used for expiry."""
+    now = [T0]
+    monkeypatch.setattr(aggregator.time, "time_ns", lambda: int(now[0] * 1e9))
+    return now
+
+
+def iso(t):
+    return datetime.fromtimestamp(t, tz=timezone.utc).isoformat()
+
+
+def test_empty_summary():
+    assert NoiseProfile().summary() == {"count": 0}
+
+
+def test_summary_tracks_mean_min_max(clock):
+    p = NoiseProfile(window_s=60)
+    values = [-40.0, -55.5, -30.25, -48.0]
+    for i, v in enumerate(values):
+        p.add(iso(T0 + i), v)
+    s = p.summary()
+    assert s["count"] == 4
+    assert s["mean_rms_db"] == pytest.approx(np.mean(values))
+    assert s["max_rms_db"] == -30.25
+    assert s["min_rms_db"] == -55.5
+
+
+def test_old_samples_expire(clock):
+    p = NoiseProfile(window_s=60)
+    p.add(iso(T0), -10.0)
+    p.add(iso(T0 + 1), -90.0)
+    p.add(iso(T0 + 30), -50.0)
+    clock[0] = T0 + 62
+    p.add(iso(T0 + 62), -40.0)
+
+    # Only the last two samples are within 60 s of the clock
+    s = p.summary()
+    assert s["count"] == 2
+    assert s["mean_rms_db"] == pytest.approx(-45.0)
+    assert s["max_rms_db"] == -40.0
+    assert s["min_rms_db"] == -50.0
+
+
+def test_out_of_order_timestamp_is_clamped(clock):
+    p = NoiseProfile(window_s=60)
+    p.add(iso(T0 + 10), -40.0)
+    # Arrives late with an earlier timestamp; kept, and expires with the newer one
+    p.add(iso(T0 - 50), -60.0)
+    clock[0] = T0 + 65
+    p.add(iso(T0 + 65), -30.0)
+    assert p.summary()["count"] == 3
+    clock[0] = T0 + 71
+    p.add(iso(T0 + 71), -30.0)
+    assert p.summary()["count"] == 2
+
+
+def test_wrapped_ring_grows_and_expires(clock):
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-80, 0, 2200)
+    p = NoiseProfile(window_s=60)
+    # 10 samples per second, so the window holds the last 600 and the ring
+    # wraps and grows along the way
+    for i, v in enumerate(values):
+        t = T0 + i / 10
+        clock[0] = t
+        p.add(iso(t), float(v))
+        if i == 1000:
+            p.resync()
+
+    window = values[-601:]
+    s = p.summary()
+    assert s["count"] == len(window)
+    assert s["mean_rms_db"] == pytest.approx(window.mean())
+    assert s["max_rms_db"] == window.max()
+    assert s["min_rms_db"] == window.min()
+
+    # The window now straddles the end of the ring
+    assert p._head + p._count > len(p._values)
+    p._sum += 1e-3  # simulated drift
+    p.resync()
+    assert p.summary()["mean_rms_db"] == pytest.approx(window.mean(), abs=1e-12)
+
+
+def test_resync_recomputes_sum(clock):
+    p = NoiseProfile(window_s=60)
+    for i in range(300):
+        p.add(iso(T0), -40.0 - i % 7)
+    expected = p._values[: p._count].sum()
+    p._sum += 1e-3  # simulated drift
+    p.resync()
+    assert p._sum == pytest.approx(expected, abs=1e-9)
@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+
+import vad  # noqa: E402
+
+
+@pytest.fixture
+def make_vad(monkeypatch):
+    """SileroVAD with the ONNX buffers set up but no model session."""
+
+    def init_onnx(self, model_path):
+        self._context_size = 64
+        self._onnx_input = np.zeros((1, 64 + self.window_samples), dtype=np.float32)
+        self._scratch_f32 = self._onnx_input[0, 64:]
+
+    def no_model(self):
+        raise AssertionError("model should not run")
+
+    monkeypatch.setattr(vad.SileroVAD, "_init_onnx", init_onnx)
+    monkeypatch.setattr(vad.SileroVAD, "_speech_prob", no_model)
+
+    def make(**kwargs):
+        kwargs.setdefault("min_silence_duration_ms", 100)
+        return vad.SileroVAD(backend="onnx", **kwargs)
+
+    return make
+
+
+def run(v, probs):
+    return [v._classify(p) for p in probs]
+
+
+def test_speech_start_and_end(make_vad):
+    v = make_vad()
+    results = run(v, [0.1, 0.9, 0.9, 0.2, 0.2, 0.2, 0.2, 0.2])
+
+    # The iterator's start boundary comes first, the start event one window later
+    assert results[1] == {"speech": False, "confidence": 0.9, "start_ms": 0, "end_ms": None}
+    assert results[2]["event"] == "start" and results[2]["speech"]
+    assert results[3]["event"] == "end" and not results[3]["speech"]
+
+    # 100 ms of silence is 1600 samples, so the end boundary waits 4 windows
+    ends = [i for i, r in enumerate(results) if r.get("end_ms") is not None]
+    assert ends == [7]
+    # Last speech window ends at sample 2048 (minus one window), plus 100 ms pad
+    assert results[7]["end_ms"] == 2048 + 1600 - 512
+    assert not v._iter_triggered and not v.triggered
+
+
+def test_start_is_padded_back_from_onset(make_vad):
+    v = make_vad()
+    results = run(v, [0.0] * 10 + [0.9])
+    # Onset window spans samples 5120-5632; padded back by 1600
+    assert results[-1]["start_ms"] == 5120 - 1600
+
+
+def test_short_dip_does_not_end_segment(make_vad):
+    v = make_vad()
+    results = run(v, [0.9, 0.9, 0.1, 0.1, 0.9] + [0.9] * 4)
+    assert all(r.get("end_ms") is None for r in results)
+    assert v._iter_triggered
+    assert v._temp_end == 0
+
+
+def test_hysteresis_band_keeps_segment_open(make_vad):
+    v = make_vad()
+    # Between threshold - 0.15 and threshold is neither speech nor silence
+    results = run(v, [0.9, 0.9] + [0.4] * 20)
+    assert all(r.get("end_ms") is None for r in results)
+    assert v._iter_triggered
+
+
+def test_reset_clears_segment_state(make_vad):
+    v = make_vad()
+    run(v, [0.9, 0.9, 0.1])
+    v.reset()
+    assert v._current_sample == 0 and v._temp_end == 0
+    assert not v._iter_triggered and not v.triggered
+    assert run(v, [0.9])[0]["start_ms"] == 0
+
+
+def test_detect_matches_process_chunk(make_vad, monkeypatch):
+    probs = [0.1, 0.9, 0.9, 0.6, 0.2, 0.2, 0.2, 0.2, 0.9, 0.9]
+    frame = np.ones(512, dtype=np.int16)
+
+    expected = [r["speech"] for r in run(make_vad(), probs)]
+
+    v = make_vad()
+    it = iter(probs)
+    monkeypatch.setattr(vad.SileroVAD, "_speech_prob", lambda self: next(it))
+    got = [v.detect(frame) for _ in probs]
+    assert [speech for speech, _ in got] == expected
+    assert [p for _, p in got] == probs
+
+
+def test_gate_skips_model_for_quiet_windows(make_vad):
+    v = make_vad(gate_dbfs=-55)
+    # About -70 dBFS
+    quiet = np.full(512, 10, dtype=np.int16)
+    for _ in range(v.GATE_RESET_WINDOWS + 1):
+        assert v.detect(quiet) == (False, 0.0)
+    assert v._gated_run == v.GATE_RESET_WINDOWS + 1
+
+
+def test_short_chunk_is_zero_padded(make_vad, monkeypatch):
+    v = make_vad()
+    seen = []
+    monkeypatch.setattr(
+        vad.SileroVAD, "_speech_prob", lambda self: seen.append(self._scratch_f32.copy()) or 0.0
+    )
+    v.process_chunk(np.full(100, 16384, dtype=np.int16))
+    window = seen[0]
+    assert window.shape == (512,)
+    assert np.all(window[:100] == 0.5) and np.all(window[100:] == 0.0)
+
+
+class FakeClient:
+    def __init__(self, *args, **kwargs):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.published.append((topic, payload))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture
+def service(make_vad, monkeypatch):
+    monkeypatch.setattr(vad.mqtt, "Client", FakeClient)
+    return vad.VADService()
+
+
+@pytest.mark.parametrize("sizes", [[512] * 6, [1] * 700, [100, 3000, 7, 900, 1], [5000]])
+def test_ring_yields_contiguous_frames(service, sizes):
+    audio = np.arange(sum(sizes), dtype=np.int16)
+    frames = []
+    pos = 0
+    for size in sizes:
+        for frame in service._buffer_frames(audio[pos : pos + size]):
+            frames.append(frame.copy())
+        pos += size
+
+    n = len(audio) // 512
+    assert len(frames) == n
+    if n:
+        np.testing.assert_array_equal(np.concatenate(frames), audio[: n * 512])
+    # The remainder waits in the ring for the next chunk
+    assert service._ring_fill == len(audio) - n * 512
+
+
+def test_service_publishes_transitions(service):
+    for speech in [False, True, True, False]:
+        service._handle_result(speech, 0.9 if speech else 0.1, 32)
+
+    topics = [topic for topic, _ in service.client.published]
+    assert topics == [
+        vad.Config.TOPIC_VAD_EVENT,
+        vad.Config.TOPIC_VAD_EVENT,
+        vad.Config.TOPIC_VAD,
+    ]
+    assert service.speech_chunks == 2
+    segment = vad.orjson.loads(service.client.published[-1][1])
+    assert (segment["start_ms"], segment["end_ms"]) == (64, 128)